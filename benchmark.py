@@ -0,0 +1,272 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Headless benchmarks of the render and interaction paths.
+
+python -m matplotlib_backend_fr.benchmark [--quick] [-o RESULT.json]
+python -m matplotlib_backend_fr.benchmark --compare OLD.json NEW.json
+
+The first form renders a matrix of plot kinds, data sizes and output
+shapes through FigureAxes.to_image(), to_image_file() and to_eps_file(),
+and replays scripted zoom and pan drags through Navigation, the GUI free
+part of KernelFigureAxes.  Only Agg and PostScript are used, no display is
+needed.  Each case runs in a fresh process, so that its peak memory is
+its own.  The result is JSON.  The second form prints the relative
+change of every rate and memory peak, and exits with status 1 if
+anything got slower, or needs more memory, beyond the tolerance."""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import resource
+import optparse
+import multiprocessing
+import json
+import numpy
+import matplotlib
+
+import matplotlib_backend_fr.figure_axes
+import matplotlib_backend_fr.navigation
+
+KINDS = ('line', 'scatter', 'image')
+SIZES = (10 ** 3, 10 ** 5, 10 ** 6)
+SHAPES = ((320, 240), (800, 600), (1920, 1080))
+QUICK_SIZES = (10 ** 3, 10 ** 4)
+QUICK_SHAPES = ((320, 240),)
+
+
+def make_figure_axes(kind, size):
+	"""A FigureAxes showing SIZE random samples as KIND."""
+
+	random = numpy.random.RandomState(0)
+	figure_axes = matplotlib_backend_fr.figure_axes.FigureAxes()
+	if kind == 'line':
+		figure_axes.axes.plot(numpy.arange(size),
+				random.standard_normal(size).cumsum())
+	elif kind == 'scatter':
+		figure_axes.axes.scatter(random.standard_normal(size),
+				random.standard_normal(size), s = 1)
+	elif kind == 'image':
+		side = int(size ** 0.5)
+		figure_axes.axes.imshow(random.random_sample((side, side)),
+				interpolation = 'nearest', aspect = 'auto')
+	else:
+		raise ValueError('unknown kind %r' % (kind,))
+	figure_axes.set_autoscale_on(True)
+	return figure_axes
+
+def get_peak_memory():
+	"""Peak resident memory of the process so far, in kB (on Linux).
+	Each case runs in a process of its own, see run_isolated()."""
+
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def time_calls(function, repeat):
+	"""Call FUNCTION(index) REPEAT times, return calls per second."""
+
+	start = time.time()
+	for index in xrange(repeat):
+		function(index)
+	return repeat / max(time.time() - start, 1e-9)
+
+def replay_zoom(navigation, figure_axes, shape, frames):
+	"""Drag from the middle to the upper right, rendering each step like
+	the panel does."""
+
+	navigation.start_zoom((0.5, 0.5))
+	def step(index):
+		factor = 2.0 ** (-(index + 1) * 0.02)
+		navigation.zoom((factor, factor))
+		figure_axes.to_image(shape)
+	return time_calls(step, frames)
+
+def replay_pan(navigation, figure_axes, shape, frames):
+	navigation.start_pan()
+	def step(index):
+		navigation.pan(((index + 1) * 0.005, (index + 1) * 0.0025))
+		figure_axes.to_image(shape)
+	return time_calls(step, frames)
+
+def run_case(kind, size, shape, directory, frames):
+	figure_axes = make_figure_axes(kind, size)
+	navigation = matplotlib_backend_fr.navigation.Navigation(figure_axes)
+	result = {'kind': kind, 'size': size, 'shape': list(shape)}
+
+	# The first frame includes the setup of the canvas.
+	start = time.time()
+	figure_axes.to_image(shape)
+	result['first_frame_seconds'] = time.time() - start
+
+	result['to_image_fps'] = time_calls(
+			lambda index: figure_axes.to_image(shape), frames)
+	result['to_image_file_per_second'] = time_calls(
+			lambda index: figure_axes.to_image_file(
+				os.path.join(directory, 'frame.png'), shape),
+			max(frames // 4, 1))
+	dpi = float(figure_axes.figure.dpi)
+	inches = (shape[0] / dpi, shape[1] / dpi)
+	result['to_eps_file_per_second'] = time_calls(
+			lambda index: figure_axes.to_eps_file(
+				os.path.join(directory, 'frame.eps'), inches),
+			max(frames // 4, 1))
+
+	figure_axes.set_autoscale_on(True)
+	result['zoom_fps'] = replay_zoom(navigation, figure_axes, shape, frames)
+	figure_axes.set_autoscale_on(True)
+	result['pan_fps'] = replay_pan(navigation, figure_axes, shape, frames)
+
+	result['peak_memory_kb'] = get_peak_memory()
+	return result
+
+def run_isolated(*args):
+	"""run_case(*ARGS) in a fresh process, so that its peak memory is not
+	that of an earlier case."""
+
+	pool = multiprocessing.Pool(1)
+	try:
+		return pool.apply(run_case, args)
+	finally:
+		pool.close()
+		pool.join()
+
+def run(kinds = None, sizes = None, shapes = None, frames = None,
+		progress = None):
+	"""Run the benchmark matrix and return the result dictionary.
+	PROGRESS, if given, is called with each case's result."""
+
+	if kinds is None:
+		kinds = KINDS
+	if sizes is None:
+		sizes = SIZES
+	if shapes is None:
+		shapes = SHAPES
+	if frames is None:
+		frames = 20
+
+	directory = tempfile.mkdtemp()
+	try:
+		cases = []
+		for kind in kinds:
+			for size in sizes:
+				for shape in shapes:
+					case = run_isolated(kind, size, shape, directory,
+							frames)
+					cases.append(case)
+					if progress is not None:
+						progress(case)
+	finally:
+		shutil.rmtree(directory)
+
+	return {'python': sys.version.split()[0],
+			'matplotlib': matplotlib.__version__,
+			'numpy': numpy.__version__,
+			'frames': frames,
+			'cases': cases}
+
+def get_measures(result):
+	"""Map (kind, size, shape, measure) to the measures of RESULT: rates,
+	higher being better, and memory peaks, lower being better."""
+
+	measures = {}
+	for case in result['cases']:
+		for (name, value) in case.iteritems():
+			if name.endswith('fps') or name.endswith('per_second') or \
+					name.endswith('_kb'):
+				key = (case['kind'], case['size'], tuple(case['shape']), name)
+				measures[key] = value
+	return measures
+
+def compare(old, new, tolerance = None):
+	"""Print the relative change of the measures of NEW against OLD.
+	Returns the number of rates which dropped, or memory peaks which
+	grew, by more than TOLERANCE (default 0.1, i.e. 10 %)."""
+
+	if tolerance is None:
+		tolerance = 0.1
+
+	(old_measures, new_measures) = (get_measures(old), get_measures(new))
+	regressions = 0
+	for key in sorted(old_measures):
+		if key not in new_measures:
+			continue
+		change = float(new_measures[key]) / old_measures[key] - 1
+		if key[3].endswith('_kb'):
+			worse = change > tolerance
+		else:
+			worse = change < -tolerance
+		if worse:
+			regressions += 1
+			mark = '  REGRESSION'
+		else:
+			mark = ''
+		sys.stdout.write('%-8s %8d %5dx%-5d %-26s %+7.1f %%%s\n' % (
+				key[0], key[1], key[2][0], key[2][1], key[3],
+				change * 100, mark))
+	return regressions
+
+def main(argv = None):
+	parser = optparse.OptionParser(usage = '%prog [--quick] [-o RESULT]\n'
+			'       %prog --compare OLD NEW')
+	parser.add_option('-o', '--output', default = None,
+			help = 'write the JSON result here instead of to stdout')
+	parser.add_option('--quick', action = 'store_true', default = False,
+			help = 'small data sizes and one shape only')
+	parser.add_option('--frames', type = 'int', default = None,
+			help = 'frames per measurement (default 20)')
+	parser.add_option('--compare', action = 'store_true', default = False,
+			help = 'compare two results')
+	parser.add_option('--tolerance', type = 'float', default = None,
+			help = 'relative slowdown to accept when comparing')
+	(options, args) = parser.parse_args(argv)
+
+	if options.compare:
+		if len(args) != 2:
+			parser.error('--compare takes OLD and NEW')
+		(old, new) = [json.load(open(filename)) for filename in args]
+		if compare(old, new, options.tolerance):
+			sys.exit(1)
+		return
+
+	if options.quick:
+		(sizes, shapes) = (QUICK_SIZES, QUICK_SHAPES)
+	else:
+		(sizes, shapes) = (SIZES, SHAPES)
+
+	def progress(case):
+		sys.stderr.write('%(kind)s %(size)d %(shape)s: '
+				'%(to_image_fps).1f fps\n' % case)
+
+	result = run(sizes = sizes, shapes = shapes, frames = options.frames,
+			progress = progress)
+	if options.output is None:
+		json.dump(result, sys.stdout, indent = 1, sort_keys = True)
+		sys.stdout.write('\n')
+	else:
+		output = open(options.output, 'w')
+		try:
+			json.dump(result, output, indent = 1, sort_keys = True)
+		finally:
+			output.close()
+
+if __name__ == '__main__':
+	main()
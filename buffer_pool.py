@@ -0,0 +1,149 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import weakref
+import threading
+
+try:
+	import Image
+except:
+	pass
+
+
+class BufferPool:
+	"""Preallocated PIL images, reused by shape, for the frames copied on
+	every render.  Images are taken with acquire() or copy() and given
+	back with release(); images the pool did not hand out are ignored by
+	release(), and images never released are simply not reused.
+
+	The pool holds at most MAX_BYTES (None for no bound) in images lent
+	and kept for reuse.  Beyond that, kept images of other shapes are
+	dropped first, and images are still handed out, but not kept when
+	released.  NBYTES and PEAK_NBYTES report the current and highest
+	usage."""
+
+	def __init__(self, max_bytes = None):
+		self.max_bytes = max_bytes
+		self.nbytes = 0
+		self.peak_nbytes = 0
+
+		# (MODE, SIZE) -> [kept images], and id(image) -> (weak reference,
+		# nbytes) of the images lent.
+		self.free = {}
+		self.lent = {}
+		self.lock = threading.RLock()
+
+	def _get_nbytes(self, mode, size):
+		return size[0] * size[1] * len(mode)
+
+	def acquire(self, mode, size):
+		"""An image of MODE and SIZE with undefined contents."""
+
+		size = tuple(size)
+		nbytes = self._get_nbytes(mode, size)
+		self.lock.acquire()
+		try:
+			images = self.free.get((mode, size))
+			if images:
+				image = images.pop()
+			else:
+				self._make_room(nbytes)
+				image = Image.new(mode, size)
+				self.nbytes += nbytes
+				self.peak_nbytes = max(self.peak_nbytes, self.nbytes)
+			key = id(image)
+			self.lent[key] = (weakref.ref(image,
+					lambda ref: self._forget(key, ref)), nbytes)
+			return image
+		finally:
+			self.lock.release()
+
+	def copy(self, image):
+		"""Like IMAGE.copy(), but into a pooled image."""
+
+		target = self.acquire(image.mode, image.size)
+		target.paste(image)
+		return target
+
+	def release(self, image):
+		self.lock.acquire()
+		try:
+			entry = self.lent.pop(id(image), None)
+			if entry is None or entry[0]() is not image:
+				return
+			if self.max_bytes is not None and self.nbytes > self.max_bytes:
+				# Lent beyond the bound.
+				self.nbytes -= entry[1]
+				return
+			self.free.setdefault((image.mode, image.size), []).append(image)
+		finally:
+			self.lock.release()
+
+	def _forget(self, key, ref):
+		"""An image lent has been dropped without release()."""
+
+		self.lock.acquire()
+		try:
+			entry = self.lent.get(key)
+			if entry is not None and entry[0] is ref:
+				del self.lent[key]
+				self.nbytes -= entry[1]
+		finally:
+			self.lock.release()
+
+	def _make_room(self, nbytes):
+		"""Drop kept images until NBYTES more fit, if possible."""
+
+		if self.max_bytes is None:
+			return
+		for key in self.free.keys():
+			images = self.free[key]
+			while images and self.nbytes + nbytes > self.max_bytes:
+				image = images.pop()
+				self.nbytes -= self._get_nbytes(image.mode, image.size)
+			if not images:
+				del self.free[key]
+
+	def clear(self):
+		"""Drop the kept images."""
+
+		self.lock.acquire()
+		try:
+			for images in self.free.itervalues():
+				for image in images:
+					self.nbytes -= self._get_nbytes(image.mode, image.size)
+			self.free = {}
+		finally:
+			self.lock.release()
+
+	def get_usage(self):
+		"""Return {'nbytes', 'peak_nbytes', 'lent', 'kept'}, the latter two
+		counting images."""
+
+		self.lock.acquire()
+		try:
+			return {'nbytes': self.nbytes,
+					'peak_nbytes': self.peak_nbytes,
+					'lent': len(self.lent),
+					'kept': sum([len(images)
+						for images in self.free.itervalues()])}
+		finally:
+			self.lock.release()
@@ -0,0 +1,130 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import heapq
+import threading
+
+
+class LRUCache:
+	"""Mapping bounded by the total size in bytes of its values.  When the
+	bound is exceeded, the least recently used entries are dropped."""
+
+	def __init__(self, max_bytes):
+		self.max_bytes = max_bytes
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+
+		# KEY -> [VALUE, NBYTES, TICK], and a heap of (TICK, KEY) which
+		# may hold outdated ticks of keys used again since.
+		self.entries = {}
+		self.heap = []
+		self.tick = 0
+		self.lock = threading.Lock()
+
+	def __len__(self):
+		return len(self.entries)
+
+	def _use(self, key, entry):
+		self.tick += 1
+		entry[2] = self.tick
+		heapq.heappush(self.heap, (self.tick, key))
+		if len(self.heap) > 4 * len(self.entries) + 16:
+			# Drop the outdated heap items.
+			self.heap = [(entry[2], key)
+					for (key, entry) in self.entries.iteritems()]
+			heapq.heapify(self.heap)
+
+	def get(self, key, default = None):
+		self.lock.acquire()
+		try:
+			entry = self.entries.get(key)
+			if entry is None:
+				self.misses += 1
+				return default
+			self.hits += 1
+			self._use(key, entry)
+			return entry[0]
+		finally:
+			self.lock.release()
+
+	def put(self, key, value, nbytes):
+		"""Store VALUE of size NBYTES under KEY.  Values larger than the
+		whole cache are not stored."""
+
+		self.lock.acquire()
+		try:
+			self._discard(key)
+			if nbytes > self.max_bytes:
+				return
+			entry = [value, nbytes, None]
+			self.entries[key] = entry
+			self.nbytes += nbytes
+			self._use(key, entry)
+			self._evict()
+		finally:
+			self.lock.release()
+
+	def discard(self, key):
+		self.lock.acquire()
+		try:
+			self._discard(key)
+		finally:
+			self.lock.release()
+
+	def clear(self):
+		self.lock.acquire()
+		try:
+			self.entries = {}
+			self.heap = []
+			self.nbytes = 0
+		finally:
+			self.lock.release()
+
+	def discard_where(self, predicate):
+		"""Discard the entries whose key satisfies PREDICATE(KEY)."""
+
+		self.lock.acquire()
+		try:
+			for key in [key for key in self.entries if predicate(key)]:
+				self._discard(key)
+		finally:
+			self.lock.release()
+
+	def set_max_bytes(self, max_bytes):
+		self.lock.acquire()
+		try:
+			self.max_bytes = max_bytes
+			self._evict()
+		finally:
+			self.lock.release()
+
+	def _discard(self, key):
+		entry = self.entries.pop(key, None)
+		if entry is not None:
+			self.nbytes -= entry[1]
+
+	def _evict(self):
+		while self.nbytes > self.max_bytes and self.heap:
+			(tick, key) = heapq.heappop(self.heap)
+			entry = self.entries.get(key)
+			if entry is not None and entry[2] == tick:
+				self._discard(key)
@@ -0,0 +1,298 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Batch export of FigureAxes views in worker processes.
+
+Command line:
+
+python -m matplotlib_backend_fr.export [-p PROCESSES] SPEC JOBS
+
+SPEC is a pickle file holding a FigureAxes (or a picklable callable
+returning one), or a .npz file with arrays x0, y0, x1, y1, ... which are
+plotted as lines, and optionally title, xlabel and ylabel.  JOBS is a text
+file with one job per line:
+
+FILENAME WIDTH HEIGHT [XMIN XMAX YMIN YMAX]
+
+WIDTH and HEIGHT are in inches for .eps/.ps/.epi files, else in pixels.
+With --strip-height, .png files are rendered in strips of that many rows,
+so that posters larger than memory can be written."""
+
+import os
+import sys
+import time
+import Queue
+import cPickle as pickle
+import optparse
+import multiprocessing
+import numpy
+import matplotlib_backend_fr.figure_axes
+
+EPS_EXTENSIONS = ('.eps', '.ps', '.epi')
+
+
+class ExportJob:
+	"""Write the view XLIM, YLIM (None keeps the limits of the figure) of
+	SHAPE to FILENAME.  SHAPE is in inches for EPS and in pixels for image
+	files.  FORMAT is 'eps' or 'image', by default guessed from the
+	extension.  With STRIP_HEIGHT, .png files are rendered and written
+	that many rows at a time, see FigureAxes.to_png_file_strips()."""
+
+	def __init__(self, filename, shape, xlim = None, ylim = None,
+			format = None, strip_height = None):
+		if format is None:
+			if os.path.splitext(filename)[1].lower() in EPS_EXTENSIONS:
+				format = 'eps'
+			else:
+				format = 'image'
+		if format not in ('eps', 'image'):
+			raise ValueError('format must be "eps" or "image"')
+
+		self.filename = filename
+		self.shape = shape
+		self.xlim = xlim
+		self.ylim = ylim
+		self.format = format
+		self.strip_height = strip_height
+
+	def run(self, figure_axes, original_lims):
+		"""Export from FIGURE_AXES.  ORIGINAL_LIMS are the limits to use
+		where the job does not specify them."""
+
+		if self.xlim is None:
+			figure_axes.set_xlim(original_lims[0])
+		else:
+			figure_axes.set_xlim(self.xlim)
+		if self.ylim is None:
+			figure_axes.set_ylim(original_lims[1])
+		else:
+			figure_axes.set_ylim(self.ylim)
+		return self.write(figure_axes)
+
+	def write(self, figure_axes):
+		"""Export the view of FIGURE_AXES as it is, leaving its limits
+		and autoscaling alone."""
+
+		if self.format == 'eps':
+			figure_axes.to_eps_file(self.filename, self.shape)
+		elif self.strip_height is not None and \
+				self.filename.lower().endswith('.png'):
+			figure_axes.to_png_file_strips(self.filename, self.shape,
+					strip_height = self.strip_height)
+		else:
+			figure_axes.to_image_file(self.filename, self.shape)
+		return self.filename
+
+
+def make_spec(figure):
+	"""Return what worker processes need to build a copy of FIGURE, a
+	FigureAxes or a picklable callable returning one."""
+
+	if callable(figure):
+		return figure
+	figure.lock.acquire()
+	try:
+		return pickle.dumps(figure, pickle.HIGHEST_PROTOCOL)
+	finally:
+		figure.lock.release()
+
+def build_figure_axes(spec):
+	"""Build the FigureAxes from SPEC as returned by make_spec()."""
+
+	if isinstance(spec, str):
+		return pickle.loads(spec)
+	return spec()
+
+
+# The figure of a worker process, and its original limits.
+_worker_state = {}
+
+def _init_worker(spec):
+	figure_axes = build_figure_axes(spec)
+	_worker_state['figure_axes'] = figure_axes
+	_worker_state['original_lims'] = \
+			(figure_axes.get_xlim(), figure_axes.get_ylim())
+
+def _run_job(job):
+	return job.run(_worker_state['figure_axes'],
+			_worker_state['original_lims'])
+
+def export_batch(figure, jobs, processes = None):
+	"""Run the ExportJob instances JOBS on PROCESSES worker processes (by
+	default one per CPU).  FIGURE is a FigureAxes, which is pickled to
+	give each worker its own copy, or a picklable callable returning a
+	FigureAxes, for figures which cannot be pickled.  FIGURE itself is
+	not changed.  Returns the list of the filenames written."""
+
+	pool = multiprocessing.Pool(processes,
+			initializer = _init_worker, initargs = (make_spec(figure),))
+	try:
+		filenames = pool.map(_run_job, jobs, chunksize = 1)
+	finally:
+		pool.close()
+		pool.join()
+	return filenames
+
+
+def _run_background(spec, job, queue):
+	try:
+		queue.put(('loading', None))
+		figure_axes = build_figure_axes(spec)
+		queue.put(('rendering', None))
+		job.run(figure_axes, (figure_axes.get_xlim(), figure_axes.get_ylim()))
+		queue.put(('done', None))
+	except Exception, error:
+		queue.put(('error', '%s: %s' % (error.__class__.__name__, error)))
+
+
+class BackgroundExport:
+	"""Runs the ExportJob JOB on a snapshot of FIGURE (as for
+	export_batch()) in a separate process, so that the caller neither
+	waits for it nor sees FIGURE changed.  The snapshot is taken by the
+	constructor; later changes of FIGURE do not affect the export.
+
+	STATE, as updated by poll(), is one of 'starting', 'loading',
+	'rendering', 'done', 'error' (with the message in ERROR), and
+	'cancelled'."""
+
+	def __init__(self, figure, job):
+		self.job = job
+		self.state = 'starting'
+		self.error = None
+		self.start = time.time()
+		self.queue = multiprocessing.Queue()
+		self.process = multiprocessing.Process(target = _run_background,
+				args = (make_spec(figure), job, self.queue))
+		self.process.daemon = True
+		self.process.start()
+
+	def poll(self):
+		"""Update and return STATE, without blocking."""
+
+		if self.is_finished():
+			return self.state
+		alive = self.process.is_alive()
+		try:
+			while not self.is_finished():
+				# The last words of an exited process may take a moment.
+				(self.state, message) = self.queue.get(not alive, 0.1)
+				if self.state == 'error':
+					self.error = message
+		except Queue.Empty:
+			pass
+		if not self.is_finished() and not alive:
+			# Died without a word, e.g. killed.
+			self.state = 'error'
+			self.error = 'export process exited with code %s' % \
+					self.process.exitcode
+		if self.is_finished():
+			self.process.join()
+		return self.state
+
+	def is_finished(self):
+		return self.state in ('done', 'error', 'cancelled')
+
+	def get_elapsed(self):
+		return time.time() - self.start
+
+	def cancel(self):
+		"""Stop the export.  A partially written file may remain."""
+
+		if not self.is_finished():
+			self.process.terminate()
+			self.process.join()
+			self.state = 'cancelled'
+
+
+class NpzSpec:
+	"""Builds a FigureAxes from the arrays in the .npz file FILENAME."""
+
+	def __init__(self, filename):
+		self.filename = filename
+
+	def __call__(self):
+		arrays = numpy.load(self.filename)
+		figure_axes = matplotlib_backend_fr.figure_axes.FigureAxes()
+		index = 0
+		while 'x%d' % index in arrays.files:
+			figure_axes.axes.plot(
+					arrays['x%d' % index], arrays['y%d' % index])
+			index += 1
+		for name in ('title', 'xlabel', 'ylabel'):
+			if name in arrays.files:
+				getattr(figure_axes, 'set_' + name)(str(arrays[name]))
+		figure_axes.set_autoscale_on(True)
+		return figure_axes
+
+
+def load_spec(filename):
+	if os.path.splitext(filename)[1].lower() == '.npz':
+		return NpzSpec(filename)
+	specfile = open(filename, 'rb')
+	try:
+		spec = pickle.load(specfile)
+	finally:
+		specfile.close()
+	return spec
+
+def load_jobs(filename):
+	jobs = []
+	jobsfile = open(filename)
+	try:
+		for line in jobsfile:
+			fields = line.split()
+			if not fields or fields[0].startswith('#'):
+				continue
+			if len(fields) not in (3, 7):
+				raise ValueError('invalid job line: %r' % line)
+			shape = tuple([float(value) for value in fields[1:3]])
+			job = ExportJob(fields[0], shape)
+			if job.format == 'image':
+				job.shape = tuple([int(value) for value in shape])
+			if len(fields) == 7:
+				lims = [float(value) for value in fields[3:]]
+				(job.xlim, job.ylim) = (lims[0:2], lims[2:4])
+			jobs.append(job)
+	finally:
+		jobsfile.close()
+	return jobs
+
+def main(argv = None):
+	parser = optparse.OptionParser(
+			usage = '%prog [-p PROCESSES] SPEC JOBS')
+	parser.add_option('-p', '--processes', type = 'int', default = None,
+			help = 'number of worker processes (default: one per CPU)')
+	parser.add_option('--strip-height', type = 'int', default = None,
+			help = 'render .png files this many rows at a time, for '
+				'images too large for memory')
+	(options, args) = parser.parse_args(argv)
+	if len(args) != 2:
+		parser.error('SPEC and JOBS are required')
+
+	spec = load_spec(args[0])
+	jobs = load_jobs(args[1])
+	for job in jobs:
+		job.strip_height = options.strip_height
+	for filename in export_batch(spec, jobs, processes = options.processes):
+		sys.stdout.write(filename + '\n')
+
+if __name__ == '__main__':
+	main()
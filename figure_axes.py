@@ -23,9 +23,22 @@
 # Developed since: Jul 2008
 # File version: 0.1.0b
 
+import time
+import itertools
+import contextlib
+import threading
+import numpy
 import matplotlib.figure
+import matplotlib.lines
+import matplotlib.collections
 import matplotlib.backends.backend_agg
 import matplotlib.backends.backend_ps
+import matplotlib_backend_fr.pyramid
+import matplotlib_backend_fr.cache
+import matplotlib_backend_fr.buffer_pool
+import matplotlib_backend_fr.png_writer
+import matplotlib_backend_fr.point_index
+import matplotlib_backend_fr.ring_buffer
 
 # Try to import PIL ...
 
@@ -35,6 +48,25 @@ except:
 	# PIL will not be available for rendering to image formats like .png .
 	pass
 
+# Tell the frames of different FigureAxes apart in shared frame caches.
+_cache_tokens = itertools.count()
+
+def merge_pending(earlier, later):
+	"""Combine the changes of the view EARLIER and LATER, as if made one
+	after the other, into a new dictionary."""
+
+	merged = earlier.copy()
+	if later.get('autoscale_on'):
+		# Limits set before are overridden by turning autoscaling on.
+		merged.pop('xlim', None)
+		merged.pop('ylim', None)
+	for name in ('autoscale', 'relimit'):
+		if merged.get(name):
+			# Requests for autoscaling add up.
+			later = dict(later, **{name: True})
+	merged.update(later)
+	return merged
+
 class FigureAxes:
 	"""Abstraction layer of an axes and a figure both together."""
 
@@ -61,11 +93,48 @@ class FigureAxes:
 
 		# Initialise attributes ...
 
+		# Layers drawn on top of the background, and the bitmap of the
+		# background for the current view.
 		self.layers = []
 		self.drawn_layers = []
 		self.needs_reset = False
+		self.background = None
+		self.background_key = None
+
+		# VERSION counts the changes not visible in the view key, for the
+		# optional cache of whole frames.
+		self.version = 0
+		self.frame_cache = None
+		self.cache_token = _cache_tokens.next()
+
+		# Optional pool of the images handed out per frame.
+		self.buffer_pool = None
 
 		self.figure = figure
+
+		# Serialises rendering in a background thread against changes of
+		# the artists.  Changes of the view (limits, labels, autoscaling)
+		# do not wait for it, see batch().
+		self.lock = threading.RLock()
+
+		# Changes are made in batches, see batch().  Each thread keeps the
+		# state of its batch in BATCH_STATE, see get_batch().
+		# VIEW_PENDING holds the changes of the view committed but not
+		# yet applied to SELF.AXES, and is replaced, not modified, under
+		# VIEW_LOCK.
+		self.batch_state = threading.local()
+		self.view_lock = threading.Lock()
+		self.view_pending = {}
+		self.invalidation_hooks = []
+
+		# The Agg canvas is kept between frames, so that its renderer can
+		# be reused as long as the shape does not change.
+		self.agg_canvas = None
+		self.agg_shape = None
+
+		# Seconds of the last to_image() spent in the Agg draw and in
+		# getting the buffer into PIL.
+		self.last_timing = {'draw': None, 'buffer': None}
 		
 		if axes is None:
 			# Create a new axes instance.
@@ -85,75 +154,978 @@ class FigureAxes:
 		# Turn autoscaling on.
 		self.set_autoscale_on(autoscaling)
 	
+	def __getstate__(self):
+		"""Copies (e.g. for worker processes) leave the lock, the Agg
+		canvas and the cached bitmaps behind."""
+
+		with self.lock:
+			# Copies have their view applied.
+			self.apply_pending()
+			state = self.__dict__.copy()
+		for name in ('lock', 'batch_state', 'view_lock'):
+			del state[name]
+		state.update(agg_canvas = None, agg_shape = None,
+				background = None, background_key = None,
+				needs_reset = True, frame_cache = None, buffer_pool = None,
+				view_pending = {}, invalidation_hooks = [])
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.lock = threading.RLock()
+		self.batch_state = threading.local()
+		self.view_lock = threading.Lock()
+		self.cache_token = _cache_tokens.next()
+
+	def get_batch(self):
+		"""The batch of the calling thread: its DEPTH, the changes of the
+		view PENDING in it, whether it is DIRTY, i.e. changed anything,
+		and whether it has LOCKED SELF.LOCK."""
+
+		batch = self.batch_state
+		if not hasattr(batch, 'depth'):
+			batch.depth = 0
+			batch.pending = {}
+			batch.dirty = False
+			batch.locked = False
+		return batch
+
+	def begin(self, lock = None):
+		"""Start a batch of changes, see batch().  With LOCK, the batch
+		holds SELF.LOCK from here on until its end."""
+
+		batch = self.get_batch()
+		if lock and not batch.locked:
+			self.lock.acquire()
+			batch.locked = True
+		batch.depth += 1
+
+	def commit(self):
+		"""End the batch begun last.  The outermost commit hands the
+		changes of the view over to be applied to SELF.AXES, now if no
+		render is in progress, else by the next render, and, if anything
+		changed, calls the invalidation hooks once."""
+
+		batch = self.get_batch()
+		batch.depth -= 1
+		if batch.depth:
+			return
+
+		(pending, batch.pending) = (batch.pending, {})
+		(dirty, batch.dirty) = (batch.dirty, False)
+		(locked, batch.locked) = (batch.locked, False)
+		try:
+			if pending:
+				self.view_lock.acquire()
+				try:
+					self.view_pending = merge_pending(self.view_pending,
+							pending)
+				finally:
+					self.view_lock.release()
+			if self.lock.acquire(False):
+				try:
+					self.apply_pending()
+				finally:
+					self.lock.release()
+		finally:
+			if locked:
+				self.lock.release()
+		if dirty:
+			for hook in list(self.invalidation_hooks):
+				hook(self)
+
+	@contextlib.contextmanager
+	def batch(self):
+		"""with figure_axes.batch(): ... makes the changes inside one:
+		titles, labels, limits and autoscaling are applied to SELF.AXES
+		once at the end, and the invalidation hooks are called once.
+		Batches nest, and are per thread.  A batch changing only the view
+		never waits for a render in progress; the render after it applies
+		the changes then.  Limits from autoscaling are known only after
+		they have been applied."""
+
+		self.begin()
+		try:
+			yield self
+		finally:
+			self.commit()
+
+	@contextlib.contextmanager
+	def change(self, lock = None):
+		"""A batch() which changes the figure.  Unless LOCK is False, for
+		changes of the view only, the batch holds SELF.LOCK."""
+
+		if lock is None:
+			lock = True
+
+		self.begin(lock = lock)
+		try:
+			self.get_batch().dirty = True
+			yield self
+		finally:
+			self.commit()
+
+	def apply_pending(self):
+		"""Apply the committed changes of the view to SELF.AXES, in the
+		order the calls were made.  Call with SELF.LOCK held."""
+
+		pending = self.view_pending
+		if not pending:
+			return
+
+		for name in ('title', 'xlabel', 'ylabel'):
+			if name in pending:
+				getattr(self.axes, 'set_' + name)(pending[name])
+		autoscale_on = pending.get('autoscale_on',
+				self.axes.get_autoscale_on())
+		if pending.get('autoscale'):
+			# With autoscaling on, even if it was turned off later.
+			self.axes.set_autoscale_on(True)
+			self.autoscale(relimit = pending.get('relimit'))
+		self.axes.set_autoscale_on(autoscale_on)
+		if pending.get('xlim') is not None:
+			self.axes.set_xlim(pending['xlim'])
+		if pending.get('ylim') is not None:
+			self.axes.set_ylim(pending['ylim'])
+
+		# Until here, get_xlim() etc. still find the changes pending.
+		self.view_lock.acquire()
+		try:
+			if self.view_pending is pending:
+				self.view_pending = {}
+		finally:
+			self.view_lock.release()
+
+	def add_invalidation_hook(self, hook):
+		"""HOOK(FIGURE_AXES) is called after every change, once per batch,
+		in the thread which made the change, e.g. to schedule a frame."""
+
+		self.invalidation_hooks.append(hook)
+
+	def remove_invalidation_hook(self, hook):
+		self.invalidation_hooks.remove(hook)
+
 	def set_title(self, title):
-		self.axes.set_title(title)
-		self.title = title
+		with self.change(lock = False):
+			self.get_batch().pending['title'] = title
+			self.title = title
 
 	def set_xlabel(self, xlabel):
-		self.axes.set_xlabel(xlabel)
-		self.xlabel = xlabel
+		with self.change(lock = False):
+			self.get_batch().pending['xlabel'] = xlabel
+			self.xlabel = xlabel
 
 	def set_ylabel(self, ylabel):
-		self.axes.set_ylabel(ylabel)
-		self.ylabel = ylabel
+		with self.change(lock = False):
+			self.get_batch().pending['ylabel'] = ylabel
+			self.ylabel = ylabel
 
 	def set_xlim(self, lim):
-		if lim is not None:
-			self.set_autoscale_on(False)
-			self.axes.set_xlim(lim)
-		self.xlim = lim
+		with self.change(lock = False):
+			if lim is not None:
+				self.set_autoscale_on(False)
+				self.get_batch().pending['xlim'] = lim
+			self.xlim = lim
 
 	def set_ylim(self, lim):
-		if lim is not None:
-			self.set_autoscale_on(False)
-			self.axes.set_ylim(lim)
-		self.ylim = lim
+		with self.change(lock = False):
+			if lim is not None:
+				self.set_autoscale_on(False)
+				self.get_batch().pending['ylim'] = lim
+			self.ylim = lim
 
 	def get_xlim(self):
-		return self.axes.get_xlim()
+		"""The x limits, including those set in the batch of the calling
+		thread, and those committed but not yet applied."""
+
+		return self.get_lim('xlim', self.axes.get_xlim)
 
 	def get_ylim(self):
-		return self.axes.get_ylim()
+		return self.get_lim('ylim', self.axes.get_ylim)
+
+	def get_lim(self, name, get_applied):
+		pending = self.get_batch().pending
+		lim = pending.get(name)
+		if lim is None and not pending.get('autoscale_on'):
+			lim = self.view_pending.get(name)
+		if lim is not None:
+			return tuple(lim)
+		return get_applied()
 
 	def set_autoscale_on(self, autoscale_on):
-		self.axes.set_autoscale_on(autoscale_on)
-		if autoscale_on:
-			self.set_xlim(None)
-			self.set_ylim(None)
-			self.axes.autoscale_view()
-		self.autoscale_on = autoscale_on
+		with self.change(lock = False):
+			pending = self.get_batch().pending
+			pending['autoscale_on'] = autoscale_on
+			if autoscale_on:
+				self.set_xlim(None)
+				self.set_ylim(None)
+				pending.pop('xlim', None)
+				pending.pop('ylim', None)
+				self.apply_autoscale()
+			self.autoscale_on = autoscale_on
+
+	def get_data_bounds(self):
+		"""Combine the bounds kept by the layers, in time proportional to
+		the number of layers.  Returns ((xmin, xmax), (ymin, ymax)), or
+		None if there are artists whose bounds are not known."""
+
+		layer_artists = 0
+		bounds = []
+		for layer in self.layers:
+			if not layer.bounded:
+				return None
+			layer_artists += len(layer.artists)
+			layer_bounds = layer.get_bounds()
+			if layer_bounds is not None:
+				bounds.append(layer_bounds)
+
+		axes = self.axes
+		if len(axes.lines) + len(axes.collections) + len(axes.images) + \
+				len(axes.patches) != layer_artists or not bounds:
+			# Artists not in layers, or no data at all.
+			return None
+
+		return ((min([b[0][0] for b in bounds]),
+				 max([b[0][1] for b in bounds])),
+				(min([b[1][0] for b in bounds]),
+				 max([b[1][1] for b in bounds])))
+
+	def apply_autoscale(self, relimit = None):
+		"""Autoscale the axes to the bounds kept by the layers if possible.
+		Otherwise the data limits of the axes are used, after rescanning
+		all artists if RELIMIT is True.  Happens at the end of the batch."""
+
+		with self.batch():
+			pending = self.get_batch().pending
+			pending['autoscale'] = True
+			if relimit:
+				pending['relimit'] = True
+
+	def autoscale(self, relimit = None):
+		bounds = self.get_data_bounds()
+		if bounds is not None:
+			((x0, x1), (y0, y1)) = bounds
+			self.axes.dataLim.set_points(numpy.array([[x0, y0], [x1, y1]]))
+			self.axes.ignore_existing_data_limits = False
+		elif relimit:
+			self.axes.relimit()
+		self.axes.autoscale_view()
 
 	def clear(self):
-		self.axes.clear()
-		self.set_title(self.title)
-		self.set_xlabel(self.xlabel)
-		self.set_ylabel(self.ylabel)
-		self.set_xlim(self.xlim)
-		self.set_ylim(self.ylim)
-
-	def to_image(self, shape):
-		dpi = self.figure.dpi
-		self.figure.set_size_inches(
-				float(shape[0]) / dpi,
-				float(shape[1]) / dpi)
-
-		agg_figure_container = matplotlib.backends.backend_agg.\
-				FigureCanvasAgg(self.figure)
-		agg_figure_container.draw()
-		image_string = agg_figure_container.tostring_rgb()
-
-		image = Image.fromstring("RGB", shape, image_string)
+		with self.change():
+			self.axes.clear()
+			for layer in self.layers:
+				layer.close()
+			self.layers = []
+			self.drawn_layers = []
+			self.invalidate()
+			self.set_title(self.title)
+			self.set_xlabel(self.xlabel)
+			self.set_ylabel(self.ylabel)
+			self.set_xlim(self.xlim)
+			self.set_ylim(self.ylim)
+
+	def invalidate(self):
+		"""Call after changing SELF.AXES directly, so that cached bitmaps
+		are not used for the next frame."""
+
+		with self.change():
+			self.needs_reset = True
+			self.version += 1
+			self.discard_frames()
+
+	def set_frame_cache(self, max_bytes, cache = None):
+		"""Keep up to MAX_BYTES of rendered frames, so that returning to a
+		view already rendered does not draw again.  None turns the cache
+		off.  Changes to SELF.AXES not made through this class must be
+		followed by invalidate().  If CACHE, a
+		matplotlib_backend_fr.cache.LRUCache, is given, it is used instead
+		of a cache of our own and MAX_BYTES is ignored, so that several
+		figures can share one memory bound."""
+
+		with self.lock:
+			if cache is not None:
+				self.discard_frames()
+				self.frame_cache = cache
+			elif max_bytes is None:
+				self.frame_cache = None
+			elif self.frame_cache is None:
+				self.frame_cache = matplotlib_backend_fr.cache.\
+						LRUCache(max_bytes)
+			else:
+				self.frame_cache.set_max_bytes(max_bytes)
+
+	def set_buffer_pool(self, max_bytes, pool = None):
+		"""Take the frames handed out by to_image() from a
+		matplotlib_backend_fr.buffer_pool.BufferPool holding up to
+		MAX_BYTES, or from POOL if given (e.g. shared between figures).
+		Images given back with release_image() are reused then.  None
+		turns pooling off.  Frames going into the frame cache are never
+		pooled."""
+
+		with self.lock:
+			if pool is not None:
+				self.buffer_pool = pool
+			elif max_bytes is None:
+				self.buffer_pool = None
+			else:
+				self.buffer_pool = matplotlib_backend_fr.buffer_pool.\
+						BufferPool(max_bytes)
+
+	def release_image(self, image):
+		"""Give back IMAGE from to_image() once it is no longer used.
+		Does nothing unless IMAGE came from the buffer pool."""
+
+		if self.buffer_pool is not None:
+			self.buffer_pool.release(image)
+
+	def copy_frame(self, image):
+		"""A copy of IMAGE for the caller of to_image()."""
+
+		if self.buffer_pool is None or self.frame_cache is not None:
+			return image.copy()
+		return self.buffer_pool.copy(image)
+
+	def discard_frames(self):
+		"""Drop the cached frames, which cannot be hit any more after the
+		data has changed."""
+
+		if self.frame_cache is not None:
+			token = self.cache_token
+			self.frame_cache.discard_where(lambda key: key[0] == token)
+
+	def get_layer(self, name):
+		for layer in self.layers:
+			if layer.name == name:
+				return layer
+		raise KeyError('no layer %r' % (name,))
+
+	def add_layer(self, name, artists = None):
+		"""Add a layer NAME holding ARTISTS, which have been added to
+		SELF.AXES already (e.g. by SELF.AXES.plot()).  The artists are
+		drawn into a bitmap of their own, which is redrawn only when the
+		view or the layer has changed."""
+
+		with self.change():
+			if name in [layer.name for layer in self.layers]:
+				raise ValueError('layer %r exists already' % (name,))
+			layer = Layer(name)
+			self.layers.append(layer)
+			layer.set_artists(artists)
+			self.discard_frames()
+			return layer
+
+	def update_layer(self, name, artists = None):
+		"""Mark layer NAME as changed.  If ARTISTS is given, it replaces
+		the artists of the layer, and the old ones are removed from the
+		axes."""
+
+		with self.change():
+			layer = self.get_layer(name)
+			if artists is not None:
+				layer.remove_artists()
+				layer.set_artists(artists)
+			else:
+				layer.touch()
+			self.discard_frames()
+			return layer
+
+	def add_decimated_line(self, name, x, y, pyramid = None,
+			**line_kwargs):
+		"""Plot the line Y(X), with X ascending, as layer NAME.  Only about
+		two points per pixel column are handed to Agg, taken from a min/max
+		pyramid of the data, so the time per frame does not depend on the
+		length of the data.  LINE_KWARGS are passed to SELF.AXES.plot().
+		If PYRAMID is given, e.g. the PYRAMID of the layer of another
+		figure showing the same data, it is used instead of building one
+		from X and Y, which are ignored then."""
+
+		with self.change():
+			if name in [layer.name for layer in self.layers]:
+				raise ValueError('layer %r exists already' % (name,))
+			if pyramid is None:
+				pyramid = matplotlib_backend_fr.pyramid.MinMaxPyramid(x, y)
+
+			# Start with a coarse version, which has the full bounds, for
+			# autoscaling.
+			(level, xs, ys) = pyramid.query(
+					(pyramid.x[0], pyramid.x[-1]), 1024)
+			(line,) = self.axes.plot(xs, ys, **line_kwargs)
+			if self.autoscale_on:
+				self.apply_autoscale()
+
+			layer = DecimatedLine(name, line, pyramid)
+			self.layers.append(layer)
+			self.discard_frames()
+			return layer
+
+	def add_heatmap(self, name, data, extent = None, reduction = None,
+			directory = None, pyramid = None, **imshow_kwargs):
+		"""Show the 2d array DATA, row 0 at the bottom, over EXTENT (left,
+		right, bottom, top) as layer NAME.  Each frame hands Agg only the
+		part in view of the level of a mean (with REDUCTION 'max':
+		maximum) pyramid matching the resolution, so that panning and
+		zooming takes time with the pixels of the panel, not with the size
+		of DATA.  See matplotlib_backend_fr.pyramid.ImagePyramid for
+		DIRECTORY.  PYRAMID may be given instead of DATA, as for
+		add_decimated_line(); only a pyramid built here is closed when
+		the layer is removed.  IMSHOW_KWARGS are passed to
+		SELF.AXES.imshow(); the colour limits default to the range of
+		DATA."""
+
+		with self.change():
+			if name in [layer.name for layer in self.layers]:
+				raise ValueError('layer %r exists already' % (name,))
+			owned = pyramid is None
+			if owned:
+				pyramid = matplotlib_backend_fr.pyramid.ImagePyramid(data,
+						extent = extent, reduction = reduction,
+						directory = directory)
+
+			# Start with a coarse version of the whole extent.
+			(xlim, ylim) = pyramid.get_bounds()
+			(level, array, extent) = pyramid.query(xlim, ylim, (256, 256))
+			imshow_kwargs.setdefault('vmin', pyramid.vmin)
+			imshow_kwargs.setdefault('vmax', pyramid.vmax)
+			imshow_kwargs.setdefault('aspect', 'auto')
+			imshow_kwargs.setdefault('interpolation', 'nearest')
+			image = self.axes.imshow(array, extent = extent,
+					origin = 'lower', **imshow_kwargs)
+			if self.autoscale_on:
+				self.apply_autoscale()
+
+			layer = Heatmap(name, image, pyramid, owned)
+			self.layers.append(layer)
+			self.discard_frames()
+			return layer
+
+	def add_series(self, name, capacity = None, **line_kwargs):
+		"""Add the live series NAME, holding the last CAPACITY samples
+		(default 2 ** 20) appended by append().  LINE_KWARGS are passed to
+		SELF.AXES.plot()."""
+
+		if capacity is None:
+			capacity = 2 ** 20
+
+		with self.change():
+			if name in [layer.name for layer in self.layers]:
+				raise ValueError('layer %r exists already' % (name,))
+			(line,) = self.axes.plot([], [], **line_kwargs)
+			layer = LiveSeries(name, line,
+					matplotlib_backend_fr.ring_buffer.RingBuffer(capacity))
+			self.layers.append(layer)
+			self.discard_frames()
+			return layer
+
+	def append(self, series, x, y):
+		"""Append the samples X, Y to the live series SERIES, which is
+		created by add_series() if needed.  The line artist of the series
+		is updated in place.  May be called from any thread."""
+
+		with self.change():
+			try:
+				layer = self.get_layer(series)
+			except KeyError:
+				layer = self.add_series(series)
+			layer.append(x, y)
+			self.version += 1
+			self.discard_frames()
+			if self.autoscale_on:
+				self.apply_autoscale(relimit = True)
+
+	def remove_layer(self, name):
+		with self.change():
+			layer = self.get_layer(name)
+			layer.remove_artists()
+			layer.close()
+			self.layers.remove(layer)
+			self.discard_frames()
+			if self.autoscale_on:
+				self.apply_autoscale(relimit = True)
+
+	def build_point_indices(self):
+		"""Build the indices used by pick() now, instead of on its first
+		call."""
+
+		with self.lock:
+			for layer in self.layers:
+				layer.get_point_index()
+
+	def pick(self, x, y, radius):
+		"""Return (layer, number, x, y) of the data point of the layers
+		nearest to (X, Y) within the ellipse of the radii RADIUS (rx, ry),
+		or None.  NUMBER is the index of the point in the layer.  The
+		indices are built on the first call, and after a layer changed."""
+
+		with self.lock:
+			best = None
+			for layer in self.layers:
+				point_index = layer.get_point_index()
+				if point_index is None:
+					continue
+				found = point_index.nearest(x, y, radius)
+				if found is not None and (best is None or found[0] < best[0]):
+					best = found + (layer,)
+			if best is None:
+				return None
+			(distance, number, xfound, yfound, layer) = best
+			return (layer, number, xfound, yfound)
+
+	def get_view_key(self, shape):
+		"""Describes everything of the view which is not part of the
+		layers."""
+
+		# Of what is drawn, i.e. without changes not yet applied.
+		return (tuple(shape), self.figure.dpi,
+				tuple(self.axes.get_position().bounds),
+				tuple(self.axes.get_xlim()), tuple(self.axes.get_ylim()),
+				self.title, self.xlabel, self.ylabel)
+
+	def get_frame_key(self, shape):
+		return (self.cache_token, self.get_view_key(shape), self.version,
+				tuple([(layer.name, layer.version) for layer in self.layers]))
+
+	def draw_layers(self, agg_figure_container, shape):
+		"""Composite the background and the layers, redrawing only the
+		bitmaps which are out of date."""
+
+		view_key = self.get_view_key(shape)
+
+		if self.needs_reset or self.background is None or \
+				self.background_key != view_key:
+			# The layer artists are animated, so they are skipped here.
+			agg_figure_container.draw()
+			self.background = buffer_to_image(agg_figure_container).copy()
+			self.background_key = view_key
+			self.needs_reset = False
+
+		renderer = agg_figure_container.get_renderer()
+		pixels = agg_figure_container.get_width_height()
+		image = self.copy_frame(self.background)
+		for layer in self.layers:
+			layer.prepare(self, pixels)
+			layer_key = (view_key, layer.version)
+			if layer.bitmap is None or layer.bitmap_key != layer_key:
+				renderer.clear()
+				for artist in layer.artists:
+					self.axes.draw_artist(artist)
+				layer.bitmap = buffer_to_image(agg_figure_container).copy()
+				layer.bitmap_key = layer_key
+			image.paste(layer.bitmap, (0, 0), layer.bitmap)
+
+		self.drawn_layers = list(self.layers)
+		return image
+
+	def get_agg_canvas(self, shape):
+		"""Return the Agg canvas of the figure, sized to SHAPE pixels."""
+
+		if self.agg_canvas is None or \
+				self.figure.canvas is not self.agg_canvas:
+			# Either the first frame or another canvas (e.g. PostScript)
+			# has taken over the figure in between.
+			self.agg_canvas = matplotlib.backends.backend_agg.\
+					FigureCanvasAgg(self.figure)
+			self.agg_shape = None
+			# Layers are drawn with the renderer of the last background.
+			self.needs_reset = True
+
+		if shape != self.agg_shape:
+			dpi = self.figure.dpi
+			self.figure.set_size_inches(
+					float(shape[0]) / dpi,
+					float(shape[1]) / dpi)
+			self.agg_shape = shape
+
+		return self.agg_canvas
+
+	def to_image(self, shape, copy = None, scale = None):
+		"""Render to a RGBA PIL image of SHAPE pixels.  Unless COPY is
+		True, the image shares its memory with the Agg renderer, and is
+		only valid until the next call.  Images may come from the frame
+		cache, and must not be modified.  With SCALE, the figure is laid
+		out for SHAPE but rendered at SCALE times the resolution, giving
+		an image of SCALE * SHAPE pixels."""
+
+		if scale is None:
+			scale = 1
+
+		with self.lock:
+			self.apply_pending()
+			agg_figure_container = self.get_agg_canvas(shape)
+			if scale == 1:
+				return self.render_frame(agg_figure_container, shape, copy)
+
+			dpi = self.figure.dpi
+			self.figure.set_dpi(dpi * scale)
+			try:
+				return self.render_frame(agg_figure_container, shape, copy)
+			finally:
+				self.figure.set_dpi(dpi)
+
+	def render_frame(self, agg_figure_container, shape, copy):
+		"""Draw the current view, or take it from the frame cache."""
+
+		if self.frame_cache is not None:
+			frame_key = self.get_frame_key(shape)
+			image = self.frame_cache.get(frame_key)
+			if image is not None:
+				self.last_timing = {'draw': 0.0, 'buffer': 0.0}
+				return image
+
+		start = time.time()
+		if self.layers:
+			# The composite owns its memory anyway.
+			image = self.draw_layers(agg_figure_container, shape)
+			self.last_timing = {'draw': time.time() - start, 'buffer': None}
+		else:
+			agg_figure_container.draw()
+			drawn = time.time()
+			image = buffer_to_image(agg_figure_container)
+			if copy or self.frame_cache is not None:
+				image = self.copy_frame(image)
+			self.last_timing = {'draw': drawn - start,
+					'buffer': time.time() - drawn}
+
+		if self.frame_cache is not None:
+			(width, height) = image.size
+			self.frame_cache.put(frame_key, image, width * height * 4)
 		return image
 
 	def to_image_file(self, filename, shape):
-		im = self.to_image(shape)
-		im.save(filename)
+		with self.lock:
+			im = self.to_image(shape)
+			im.convert('RGB').save(filename)
+			self.release_image(im)
+
+	def to_png_file_strips(self, filename, shape, strip_height = None):
+		"""Write a PNG of SHAPE pixels to FILENAME, rendering and
+		compressing STRIP_HEIGHT (default 512) rows at a time.  Memory use
+		is bounded by the strip size, not by SHAPE, for wall size prints.
+		For each strip, the axes is placed where it is in the whole
+		image; artists of the figure outside the axes (e.g. a suptitle)
+		are not moved and come out wrong."""
+
+		if strip_height is None:
+			strip_height = 512
+		(width, height) = shape
+
+		output = open(filename, 'wb')
+		try:
+			writer = matplotlib_backend_fr.png_writer.PNGWriter(
+					output, shape)
+			with self.lock:
+				self.apply_pending()
+				position = self.axes.get_position()
+				# The strips would only push useful frames out.
+				(frame_cache, self.frame_cache) = (self.frame_cache, None)
+				try:
+					for top in xrange(0, height, strip_height):
+						rows = min(strip_height, height - top)
+						# Pixels of the whole image below the strip.
+						below = height - top - rows
+						self.axes.set_position((position.x0,
+								(position.y0 * height - below) / float(rows),
+								position.width,
+								position.height * height / float(rows)))
+						# Not to_image(), which would apply changes of
+						# the view made since the first strip.
+						image = self.render_frame(
+								self.get_agg_canvas((width, rows)),
+								(width, rows), None)
+						writer.write_rows(numpy.asarray(image)[:, :, :3])
+						self.release_image(image)
+				finally:
+					self.axes.set_position(position)
+					self.frame_cache = frame_cache
+			writer.close()
+		finally:
+			output.close()
 
 	def to_eps_file(self, filename, shape):
-		self.figure.set_size_inches(shape[0], shape[1])
+		with self.lock:
+			self.apply_pending()
+			self.figure.set_size_inches(shape[0], shape[1])
+			self.agg_shape = None
+
+			# The layer artists are animated, which Figure.draw() skips;
+			# print them along with the rest.
+			dpi = self.figure.dpi
+			pixels = (int(shape[0] * dpi), int(shape[1] * dpi))
+			artists = []
+			for layer in self.layers:
+				layer.prepare_print(self, pixels)
+				artists.extend(layer.artists)
+			for artist in artists:
+				artist.set_animated(False)
+			try:
+				ps_figure_container = matplotlib.backends.backend_ps.\
+						FigureCanvasPS(self.figure)
+				ps_figure_container.print_eps(
+						outfile = filename,
+						dpi = dpi)
+			finally:
+				for artist in artists:
+					artist.set_animated(True)
+
+
+class Layer:
+	"""A named group of artists of a FigureAxes, together with the bitmap
+	they were last drawn to.  VERSION counts the changes of the layer."""
+
+	# Whether get_bounds() knows the data bounds of the artists.
+	bounded = False
+
+	def __init__(self, name):
+		self.name = name
+		self.artists = []
+		self.version = 0
+		self.bitmap = None
+		self.bitmap_key = None
+
+		# Index of get_points() for pick(), built on demand for VERSION.
+		self.point_index = None
+		self.point_index_version = None
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state.update(bitmap = None, bitmap_key = None,
+				point_index = None, point_index_version = None)
+		return state
+
+	def set_artists(self, artists):
+		if artists is None:
+			artists = []
+		self.artists = list(artists)
+		for artist in self.artists:
+			# Keep them out of the background.
+			artist.set_animated(True)
+		self.touch()
+
+	def remove_artists(self):
+		for artist in self.artists:
+			artist.remove()
+		self.artists = []
+
+	def touch(self):
+		self.version += 1
+		self.bitmap = None
+
+	def close(self):
+		"""Called when the layer is removed from the FigureAxes, to
+		release what it holds besides the artists."""
+
+		pass
+
+	def get_bounds(self):
+		"""((xmin, xmax), (ymin, ymax)) of the data, or None if empty."""
+
+		return None
+
+	def prepare(self, figure_axes, shape):
+		"""Called before the layer is drawn into SHAPE pixels.
+		Layers depending on the view may update their artists here."""
+
+		pass
+
+	def prepare_print(self, figure_axes, shape):
+		"""Called before the layer is printed to a vector format in SHAPE
+		pixels at the dpi of the figure.  prepare() is called again
+		before the next frame."""
+
+		self.prepare(figure_axes, shape)
+
+	def get_points(self):
+		"""(x, y) arrays of the data points of the artists, or None if
+		there are none.  Lines and collections (e.g. scatter plots) have
+		points."""
+
+		(xs, ys) = ([], [])
+		for artist in self.artists:
+			if isinstance(artist, matplotlib.lines.Line2D):
+				xs.append(numpy.asarray(artist.get_xdata(), dtype = float))
+				ys.append(numpy.asarray(artist.get_ydata(), dtype = float))
+			elif isinstance(artist, matplotlib.collections.Collection):
+				offsets = numpy.asarray(artist.get_offsets(), dtype = float)
+				if offsets.ndim == 2 and len(offsets):
+					xs.append(offsets[:, 0])
+					ys.append(offsets[:, 1])
+		if not xs:
+			return None
+		return (numpy.concatenate(xs), numpy.concatenate(ys))
+
+	def get_point_index(self):
+		"""A matplotlib_backend_fr.point_index.PointIndex of get_points(),
+		or None.  Rebuilt when the layer changed."""
+
+		if self.point_index_version != self.version:
+			points = self.get_points()
+			if points is None:
+				self.point_index = None
+			else:
+				self.point_index = \
+						matplotlib_backend_fr.point_index.PointIndex(*points)
+			self.point_index_version = self.version
+		return self.point_index
+
+
+class DecimatedLine(Layer):
+	"""A layer drawing LINE from the level of PYRAMID (a
+	matplotlib_backend_fr.pyramid.MinMaxPyramid) matching the view."""
+
+	bounded = True
+
+	def __init__(self, name, line, pyramid):
+		Layer.__init__(self, name)
+		self.pyramid = pyramid
+		self.query_key = None
+		self.set_artists([line])
+		self.line = line
+
+	def get_bounds(self):
+		return self.pyramid.get_bounds()
+
+	def get_points(self):
+		# All samples, not only the level shown.
+		return (self.pyramid.x, self.pyramid.levels[0][2])
+
+	def prepare_print(self, figure_axes, shape):
+		# Vector output gets all samples, the printer resolution being
+		# unknown.
+		self.line.set_data(*self.get_points())
+		self.query_key = None
+
+	def prepare(self, figure_axes, shape):
+		xlim = tuple(figure_axes.axes.get_xlim())
+		npixels = int(figure_axes.axes.get_position().size[0] * shape[0])
+		if (xlim, npixels) == self.query_key:
+			return
+
+		# The bitmap is keyed on the view already, so this is no change
+		# of the layer.
+		(level, x, y) = self.pyramid.query(xlim, npixels)
+		self.line.set_data(x, y)
+		self.query_key = (xlim, npixels)
+
+
+class Heatmap(Layer):
+	"""A layer showing the part of the level of PYRAMID (a
+	matplotlib_backend_fr.pyramid.ImagePyramid) matching the view in the
+	AxesImage IMAGE.  PYRAMID is closed with the layer if OWNED."""
+
+	bounded = True
+
+	def __init__(self, name, image, pyramid, owned = None):
+		if owned is None:
+			owned = False
+
+		Layer.__init__(self, name)
+		self.pyramid = pyramid
+		self.owned = owned
+		self.query_key = None
+		self.set_artists([image])
+		self.image = image
+
+	def get_bounds(self):
+		return self.pyramid.get_bounds()
+
+	def close(self):
+		if self.owned:
+			self.pyramid.close()
+
+	def prepare(self, figure_axes, shape):
+		# Only the part of the axes inside the figure is queried, which
+		# is less than the whole for the strips of to_png_file_strips().
+		position = figure_axes.axes.get_position()
+		(xlim, xpixels) = self._clip(figure_axes.axes.get_xlim(),
+				(position.x0, position.x1), shape[0])
+		(ylim, ypixels) = self._clip(figure_axes.axes.get_ylim(),
+				(position.y0, position.y1), shape[1])
+		npixels = (xpixels, ypixels)
+		if npixels[0] <= 0 or npixels[1] <= 0:
+			# Nothing of the axes in view.
+			return
+		if (xlim, ylim, npixels) == self.query_key:
+			return
+
+		(level, array, extent) = self.pyramid.query(xlim, ylim, npixels)
+		self.image.set_data(array)
+
+		# set_extent() would autoscale the axes to the part.
+		axes = figure_axes.axes
+		autoscale = (axes.get_autoscalex_on(), axes.get_autoscaley_on())
+		axes.set_autoscale_on(False)
+		try:
+			self.image.set_extent(extent)
+		finally:
+			axes.set_autoscalex_on(autoscale[0])
+			axes.set_autoscaley_on(autoscale[1])
+		self.query_key = (xlim, ylim, npixels)
+
+	def _clip(self, lim, (low, high), pixels):
+		"""Return the part of LIM inside the figure, and its number of
+		pixels, for the axes spanning LOW to HIGH of the figure of PIXELS
+		pixels."""
+
+		(start, stop) = (max(low, 0.0), min(high, 1.0))
+		if stop <= start:
+			return (tuple(lim), 0)
+		scale = (lim[1] - lim[0]) / (high - low)
+		return ((lim[0] + (start - low) * scale,
+					lim[0] + (stop - low) * scale),
+				int((stop - start) * pixels))
+
+
+class LiveSeries(Layer):
+	"""A layer drawing the samples in RING_BUFFER (a
+	matplotlib_backend_fr.ring_buffer.RingBuffer) with LINE."""
+
+	bounded = True
+
+	def __init__(self, name, line, ring_buffer):
+		Layer.__init__(self, name)
+		self.ring_buffer = ring_buffer
+		self.set_artists([line])
+		self.line = line
+
+		# Samples appended ever, numbering the points in the index.
+		self.appended = 0
+
+	def get_bounds(self):
+		return self.ring_buffer.get_bounds()
+
+	def get_points(self):
+		return (self.ring_buffer.get_x(), self.ring_buffer.get_y())
+
+	def get_point_index(self):
+		# Built once, then kept up to date by append().
+		if self.point_index is None:
+			self.point_index = matplotlib_backend_fr.point_index.PointIndex(
+					self.ring_buffer.get_x(), self.ring_buffer.get_y(),
+					start = self.appended - len(self.ring_buffer))
+		return self.point_index
+
+	def append(self, x, y):
+		self.ring_buffer.append(x, y)
+		# Views into the preallocated arrays, no new artist.
+		self.line.set_data(self.ring_buffer.get_x(), self.ring_buffer.get_y())
+		self.touch()
+
+		self.appended += numpy.size(x)
+		if self.point_index is not None:
+			self.point_index.append(x, y)
+			self.point_index.drop(self.appended - len(self.ring_buffer))
+
+
+def buffer_to_image(agg_figure_container):
+	"""Wrap the RGBA buffer of the Agg canvas AGG_FIGURE_CONTAINER in a PIL
+	image without copying."""
+
+	try:
+		rgba = agg_figure_container.buffer_rgba()
+	except TypeError:
+		# Before matplotlib 1.2, buffer_rgba() takes the origin.
+		rgba = agg_figure_container.buffer_rgba(0, 0)
 
-		ps_figure_container = matplotlib.backends.backend_ps.\
-				FigureCanvasPS(self.figure)
-		ps_figure_container.print_eps(
-				outfile = filename,
-				dpi = self.figure.dpi)
+	return Image.frombuffer("RGBA",
+			agg_figure_container.get_width_height(),
+			rgba, "raw", "RGBA", 0, 1)
@@ -0,0 +1,100 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import time
+
+# The stages of a frame, in seconds:
+#	event	zoom / pan event handlers since the last frame
+#	render	the whole image generator call
+#	draw	the Agg draw inside FigureAxes.to_image()
+#	buffer	wrapping / copying the Agg buffer into a PIL image
+#	convert	PIL image to Tk PhotoImage
+#	blit	drawing the canvas
+STAGES = ('event', 'render', 'draw', 'buffer', 'convert', 'blit')
+
+
+class FrameStats:
+	"""Rolling record of the stage timings of the last WINDOW frames."""
+
+	def __init__(self, window = None):
+		if window is None:
+			window = 120
+
+		self.window = window
+		self.frames = []
+		self.hooks = []
+
+	def record(self, timing):
+		"""Record the dictionary TIMING of one frame, mapping stage names
+		to seconds (or None if not measured), and call the hooks with
+		TIMING and this instance."""
+
+		self.frames.append((time.time(), timing))
+		del self.frames[:-self.window]
+		for hook in self.hooks:
+			hook(timing, self)
+
+	def add_hook(self, hook):
+		"""HOOK(TIMING, STATS) is called after each frame, e.g. to export
+		the timings."""
+
+		self.hooks.append(hook)
+
+	def remove_hook(self, hook):
+		self.hooks.remove(hook)
+
+	def get_values(self, stage):
+		return [timing[stage] for (recorded, timing) in self.frames
+				if timing.get(stage) is not None]
+
+	def get_percentile(self, stage, percent):
+		"""The PERCENT percentile of STAGE in seconds, or None."""
+
+		values = sorted(self.get_values(stage))
+		if not values:
+			return None
+		index = int(round(percent / 100.0 * (len(values) - 1)))
+		return values[index]
+
+	def get_fps(self):
+		"""Frames per second over the window."""
+
+		if len(self.frames) < 2:
+			return None
+		duration = self.frames[-1][0] - self.frames[0][0]
+		if duration <= 0:
+			return None
+		return (len(self.frames) - 1) / duration
+
+	def summary(self, percents = None):
+		"""Return {stage: {percent: seconds}} for the recorded stages, and
+		'fps'."""
+
+		if percents is None:
+			percents = (50, 90, 99)
+
+		result = {'fps': self.get_fps()}
+		for stage in STAGES:
+			if self.get_values(stage):
+				result[stage] = dict([(percent,
+						self.get_percentile(stage, percent))
+						for percent in percents])
+		return result
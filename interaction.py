@@ -0,0 +1,134 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+class Interaction:
+	"""What a panel does with the pointer and resize events, without any
+	GUI: the mapping of drags to zooming and panning of the event
+	handlers, and when to render.  PanelFigureAxes adds Tk to it, and
+	matplotlib_backend_fr.interaction_trace.HeadlessPanel replays traces
+	through it.
+
+	A drag only leaves its newest position PENDING_MOTION, applied at the
+	next frame slot; frames are at least 1 / FRAME_RATE (default 25)
+	seconds apart.  A release renders the pending motion at once.  A
+	resize renders once the size has been stable for RESIZE_DELAY
+	seconds."""
+
+	def __init__(self,
+			event_handler_start_zoom, event_handler_zoom,
+			event_handler_start_pan, event_handler_pan,
+			frame_rate = None):
+		if frame_rate is None:
+			frame_rate = 25.0
+
+		self.event_handler_start_zoom = event_handler_start_zoom
+		self.event_handler_zoom = event_handler_zoom
+		self.event_handler_start_pan = event_handler_start_pan
+		self.event_handler_pan = event_handler_pan
+
+		self.pixelsize = None
+
+		self.motion_origin = None
+		self.zooming_origin = None
+		self.pan_origin = None
+		self.motion_mode = 'none'
+		self.pending_motion = None
+
+		self.frame_interval = 1.0 / frame_rate
+		self.last_frame_time = None
+		self.resize_delay = 0.15
+
+	def map_to_display(self, (scrx, scry)):
+		return (float(scrx) / self.pixelsize[0],
+				1 - float(scry) / self.pixelsize[1])
+
+	def map_from_display(self, (dispx, dispy)):
+		return (dispx * self.pixelsize[0], (1 - dispy) * self.pixelsize[1])
+
+	def zoom_factors(self, (x, y)):
+		pixel_distances = (self.motion_origin[0] - x,
+				y - self.motion_origin[1])
+		return [(2.0 ** (pixel_distances[i] * 0.02)) for i in (0,1)]
+
+	def start_drag(self, mode, (x, y)):
+		"""Start zooming (MODE 'zoom') or panning ('pan') at the screen
+		position (X, Y)."""
+
+		disp_coords = self.map_to_display((x, y))
+		self.motion_origin = (x, y)
+		self.motion_mode = mode
+		if mode == 'zoom':
+			self.zooming_origin = disp_coords
+			self.event_handler_start_zoom(disp_coords)
+		else:
+			self.pan_origin = disp_coords
+			self.event_handler_start_pan()
+
+	def end_drag(self):
+		self.motion_mode = 'none'
+
+	def drag(self, (x, y)):
+		"""Note the pointer at (X, Y).  Returns True if a drag is in
+		progress, a frame being needed then."""
+
+		if self.motion_mode not in ('zoom', 'pan'):
+			return False
+		# Only the most recent position matters, since zoom and pan are
+		# computed relative to the origin of the drag.
+		self.pending_motion = (self.motion_mode, x, y)
+		return True
+
+	def take_motion(self):
+		"""Apply the pending motion, if any, and return it."""
+
+		(motion, self.pending_motion) = (self.pending_motion, None)
+		if motion is not None:
+			self.apply_motion(motion)
+		return motion
+
+	def apply_motion(self, (mode, x, y)):
+		if mode == 'zoom':
+			self.event_handler_zoom(self.zoom_factors((x, y)))
+		elif mode == 'pan':
+			disp_coords = self.map_to_display((x, y))
+			compensate = [disp_coords[i] - self.pan_origin[i] for i in (0,1)]
+			self.event_handler_pan(compensate)
+
+	def get_frame_delay(self, now):
+		"""Seconds from NOW to the next frame slot."""
+
+		if self.last_frame_time is None:
+			return 0
+		return max(self.last_frame_time + self.frame_interval - now, 0)
+
+	def resize(self, pixelsize, rendered):
+		"""Note the new size PIXELSIZE.  Returns None if it did not
+		change, 'render' if it should be rendered at once since nothing
+		has been RENDERED yet, and 'delay' if rendering should wait for
+		RESIZE_DELAY seconds without further resizes."""
+
+		if pixelsize == self.pixelsize and rendered:
+			# Moved only.
+			return None
+		self.pixelsize = pixelsize
+		if not rendered:
+			return 'render'
+		return 'delay'
@@ -0,0 +1,278 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Recording and replay of the mouse and resize events of a panel.
+
+A trace file is the header MAGIC followed by one 13 byte record per event:
+the seconds since the start of the recording (double), the index of the
+event in EVENTS (byte), and two signed 16 bit integers, the pointer
+position, or the new size for 'configure'.  All little endian.
+
+PanelFigureAxes.start_recording() writes a trace,
+KernelFigureAxes.replay_trace() plays it back in the Tk panel, and
+HeadlessPanel plays it back without Tk.  Command line:
+
+python -m matplotlib_backend_fr.interaction_trace [--realtime]
+		[--profile STATS] SPEC TRACE
+
+replays TRACE against the figure of SPEC (as for
+matplotlib_backend_fr.export) without a display, optionally under
+cProfile."""
+
+import sys
+import time
+import struct
+import optparse
+
+import matplotlib_backend_fr.export
+import matplotlib_backend_fr.navigation
+import matplotlib_backend_fr.interaction
+
+MAGIC = 'MBFRTRC1'
+RECORD = struct.Struct('<dBhh')
+
+# Event names, the handlers being 'tk_' + name.
+EVENTS = ('configure',
+		'press_left_button', 'press_right_button',
+		'release_left_button', 'release_right_button',
+		'motion',
+		'double_left_button', 'double_right_button')
+
+
+class TraceEvent:
+	"""Stands in for the Tk event passed to the handlers."""
+
+	def __init__(self, x, y):
+		self.x = x
+		self.y = y
+		self.width = x
+		self.height = y
+
+
+class TraceRecorder:
+	"""Writes the events passed to record() to FILENAME."""
+
+	def __init__(self, filename):
+		self.file = open(filename, 'wb')
+		self.file.write(MAGIC)
+		self.start = time.time()
+
+	def record(self, name, x, y):
+		self.file.write(RECORD.pack(time.time() - self.start,
+				EVENTS.index(name), x, y))
+
+	def close(self):
+		self.file.close()
+
+
+def load_trace(filename):
+	"""Return the events of FILENAME as list of (seconds, name, x, y)."""
+
+	tracefile = open(filename, 'rb')
+	try:
+		data = tracefile.read()
+	finally:
+		tracefile.close()
+	if not data.startswith(MAGIC):
+		raise ValueError('%s is not a trace file' % filename)
+
+	events = []
+	for offset in xrange(len(MAGIC), len(data) - RECORD.size + 1,
+			RECORD.size):
+		(seconds, index, x, y) = RECORD.unpack_from(data, offset)
+		events.append((seconds, EVENTS[index], x, y))
+	return events
+
+def dispatch(target, name, x, y):
+	"""Call the handler of event NAME of TARGET, a PanelFigureAxes or
+	HeadlessPanel."""
+
+	getattr(target, 'tk_' + name)(TraceEvent(x, y))
+
+def replay(events, target, realtime = None):
+	"""Feed EVENTS to TARGET in this thread, as fast as possible, or with
+	the recorded delays if REALTIME is True.  A HeadlessPanel is told the
+	time of each event, and renders the frames due until then before.
+	Returns the seconds taken."""
+
+	start = time.time()
+	for (seconds, name, x, y) in events:
+		if realtime:
+			delay = start + seconds - time.time()
+			if delay > 0:
+				time.sleep(delay)
+			seconds = time.time() - start
+		if isinstance(target, HeadlessPanel):
+			target.advance(seconds)
+		dispatch(target, name, x, y)
+	if isinstance(target, HeadlessPanel):
+		target.finish()
+	return time.time() - start
+
+
+class HeadlessPanel(matplotlib_backend_fr.interaction.Interaction):
+	"""Maps the events to NAVIGATION (a
+	matplotlib_backend_fr.navigation.Navigation) through the same
+	matplotlib_backend_fr.interaction.Interaction as PanelFigureAxes,
+	rendering when the panel would, but needs no display.  Time is that
+	of the events as told by advance(), so the frame slots are those of
+	the recording; renders take no time of it.  SHAPE is the size until
+	the first 'configure' event."""
+
+	def __init__(self, navigation, shape = None, frame_rate = None):
+		if shape is None:
+			shape = (200, 200)
+
+		matplotlib_backend_fr.interaction.Interaction.__init__(self,
+				navigation.start_zoom, navigation.zoom,
+				navigation.start_pan, navigation.pan,
+				frame_rate = frame_rate)
+		self.navigation = navigation
+		self.pixelsize = shape
+		self.frames = 0
+
+		# The time now, and when the scheduled frame and resize are due.
+		self.now = 0.0
+		self.dirty = False
+		self.frame_time = None
+		self.resize_time = None
+
+	def advance(self, now):
+		"""Run what is due until NOW, in seconds since the start."""
+
+		while True:
+			due = [due_time for due_time in (self.frame_time,
+					self.resize_time) if due_time is not None and
+					due_time <= now]
+			if not due:
+				break
+			self.now = min(due)
+			if self.now == self.frame_time:
+				self.frame()
+			else:
+				self.resized()
+		self.now = max(self.now, now)
+
+	def finish(self):
+		"""Run what is still scheduled."""
+
+		due = [due_time for due_time in (self.frame_time, self.resize_time)
+				if due_time is not None]
+		if due:
+			self.advance(max(due))
+
+	def render(self):
+		self.navigation.figure_axes.to_image(self.pixelsize)
+		self.frames += 1
+
+	def update(self):
+		self.dirty = False
+		self.resize_time = None
+		self.last_frame_time = self.now
+		self.render()
+
+	def schedule_update(self):
+		self.dirty = True
+		if self.frame_time is None:
+			self.frame_time = self.now + self.get_frame_delay(self.now)
+
+	def frame(self):
+		self.frame_time = None
+		if self.take_motion() is not None:
+			self.dirty = True
+		if self.dirty:
+			self.update()
+
+	def flush_motion(self):
+		if self.pending_motion is not None:
+			self.frame_time = None
+			self.dirty = True
+			self.frame()
+
+	def resized(self):
+		self.resize_time = None
+		self.update()
+
+	def tk_configure(self, event):
+		action = self.resize((event.width, event.height), self.frames > 0)
+		if action == 'render':
+			self.update()
+		elif action == 'delay':
+			self.resize_time = self.now + self.resize_delay
+
+	def tk_press_left_button(self, event):
+		self.start_drag('zoom', (event.x, event.y))
+
+	def tk_press_right_button(self, event):
+		self.start_drag('pan', (event.x, event.y))
+
+	def tk_release_left_button(self, event):
+		self.end_drag()
+		self.flush_motion()
+
+	def tk_release_right_button(self, event):
+		self.end_drag()
+		self.flush_motion()
+
+	def tk_motion(self, event):
+		if self.drag((event.x, event.y)):
+			self.schedule_update()
+
+	def tk_double_left_button(self, event):
+		self.navigation.autozoom()
+		self.update()
+
+	def tk_double_right_button(self, event):
+		# Opens the settings dialog in the panel.
+		pass
+
+
+def main(argv = None):
+	parser = optparse.OptionParser(
+			usage = '%prog [--realtime] [--profile STATS] SPEC TRACE')
+	parser.add_option('--realtime', action = 'store_true', default = False,
+			help = 'keep the recorded delays between the events')
+	parser.add_option('--profile', default = None,
+			help = 'run under cProfile and write the statistics here')
+	(options, args) = parser.parse_args(argv)
+	if len(args) != 2:
+		parser.error('SPEC and TRACE are required')
+
+	figure_axes = matplotlib_backend_fr.export.load_spec(args[0])
+	if callable(figure_axes):
+		figure_axes = figure_axes()
+	panel = HeadlessPanel(
+			matplotlib_backend_fr.navigation.Navigation(figure_axes))
+	events = load_trace(args[1])
+
+	if options.profile is None:
+		seconds = replay(events, panel, options.realtime)
+	else:
+		import cProfile
+		profile = cProfile.Profile()
+		seconds = profile.runcall(replay, events, panel, options.realtime)
+		profile.dump_stats(options.profile)
+
+	sys.stdout.write('%d events, %d frames in %.3f s\n' % (
+			len(events), panel.frames, seconds))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,144 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+class Navigation:
+	"""Zooming and panning of a FigureAxes in display coordinates, without
+	any GUI.  KernelFigureAxes connects it to a Tk panel."""
+
+	def __init__(self, figure_axes):
+		self.figure_axes = figure_axes
+
+	def _map_to_axes_coords(self, disp_coords):
+		bbox = self.figure_axes.axes.get_position()
+		axes_position = \
+				(bbox.x0, bbox.y0, bbox.size[0], bbox.size[1]) # (l,b,w,h)
+		return ((disp_coords[0] - axes_position[0]) / axes_position[2],
+				(disp_coords[1] - axes_position[1]) / axes_position[3])
+	
+	def _map_to_data_coords(self, axes_coords):
+		lims = [self.figure_axes.get_xlim(), self.figure_axes.get_ylim()]
+		return (lims[0][0] + (lims[0][1] - lims[0][0]) * axes_coords[0],
+				lims[1][0] + (lims[1][1] - lims[1][0]) * axes_coords[1])
+
+	def _map_from_data_coords(self, data_coords):
+		"""Display coordinates of DATA_COORDS."""
+
+		lims = [self.figure_axes.get_xlim(), self.figure_axes.get_ylim()]
+		bbox = self.figure_axes.axes.get_position()
+		axes_coords = [(data_coords[i] - lims[i][0]) / (lims[i][1] - lims[i][0])
+				for i in (0,1)]
+		return (bbox.x0 + bbox.size[0] * axes_coords[0],
+				bbox.y0 + bbox.size[1] * axes_coords[1])
+
+	def start_zoom(self, disp_coords):
+		"""Initialse zooming with DISP_COORDS invariant."""
+
+		lims = [self.figure_axes.get_xlim(), self.figure_axes.get_ylim()]
+		bbox = self.figure_axes.axes.get_position()
+		axes_position = \
+				(bbox.x0,bbox.y0, bbox.size[0], bbox.size[1]) # (l,b,w,h)
+		axes_coords = self._map_to_axes_coords(disp_coords)
+		self.zoom_start_position = self._map_to_data_coords(axes_coords)
+		self.zoom_original_distances=(
+				[lims[0][0] - self.zoom_start_position[0],
+				 lims[0][1] - self.zoom_start_position[0]],
+				[lims[1][0] - self.zoom_start_position[1],
+				 lims[1][1] - self.zoom_start_position[1]])
+
+	def zoom(self, (zoomx, zoomy)):
+		"""ZOOM with magnification (ZOOMX, ZOOMY)."""
+
+		zoom_new_distances=(
+				[self.zoom_original_distances[0][0] * zoomx,
+				 self.zoom_original_distances[0][1]*zoomx],
+				[self.zoom_original_distances[1][0] * zoomy,
+				 self.zoom_original_distances[1][1]*zoomy])
+		
+		zoom_new_lims=(
+				[self.zoom_start_position[0] + zoom_new_distances[0][0],
+				 self.zoom_start_position[0] + zoom_new_distances[0][1]],
+				[self.zoom_start_position[1] + zoom_new_distances[1][0],
+				 self.zoom_start_position[1] + zoom_new_distances[1][1]])
+
+		with self.figure_axes.batch():
+			self.figure_axes.set_xlim(zoom_new_lims[0])
+			self.figure_axes.set_ylim(zoom_new_lims[1])
+		self.limits_changed()
+
+	def start_pan(self):
+		"""Start panning."""
+
+		lims = \
+				[list(self.figure_axes.get_xlim()),
+				 list(self.figure_axes.get_ylim())]
+		self.pan_start_lims=lims
+		
+		bbox = self.figure_axes.axes.get_position()
+		axes_position = \
+				(bbox.x0, bbox.y0, bbox.size[0], bbox.size[1]) # (l,b,w,h)
+		self.pan_ratio=(
+				(lims[0][1] - lims[0][0]) / axes_position[2],
+				(lims[1][1] - lims[1][0]) / axes_position[3])
+
+	def pan(self,compensate):
+		"""Pan with COMPENSATE."""
+
+		movement=(
+				self.pan_ratio[0] * compensate[0],
+				self.pan_ratio[1] * compensate[1])
+		pan_new_lims=(
+				[self.pan_start_lims[0][0] - movement[0],
+				 self.pan_start_lims[0][1] - movement[0]],
+				[self.pan_start_lims[1][0] - movement[1],
+				 self.pan_start_lims[1][1] - movement[1]])
+		with self.figure_axes.batch():
+			self.figure_axes.set_xlim(pan_new_lims[0])
+			self.figure_axes.set_ylim(pan_new_lims[1])
+		self.limits_changed()
+
+	def pick(self, disp_coords, pixelsize, radius):
+		"""Return (layer, number, x, y) of the data point nearest to
+		DISP_COORDS, within RADIUS pixels of the display of size PIXELSIZE,
+		or None.  See FigureAxes.pick()."""
+
+		(x, y) = self._map_to_data_coords(self._map_to_axes_coords(disp_coords))
+		lims = [self.figure_axes.get_xlim(), self.figure_axes.get_ylim()]
+		size = self.figure_axes.axes.get_position().size
+		# One pixel in data units, per axis.
+		pixel = [abs(lims[i][1] - lims[i][0]) / max(size[i] * pixelsize[i], 1)
+				for i in (0,1)]
+		if not (pixel[0] > 0 and pixel[1] > 0):
+			return None
+		return self.figure_axes.pick(x, y,
+				(pixel[0] * radius, pixel[1] * radius))
+
+	def autozoom(self):
+		"""Turn autozoom on."""
+
+		self.figure_axes.set_autoscale_on(True)
+		self.limits_changed()
+
+	def limits_changed(self):
+		"""Called after zooming, panning and autozooming changed the
+		limits."""
+
+		pass
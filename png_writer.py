@@ -0,0 +1,87 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Incremental writer of RGB PNG files, for images too large to be held
+in memory at once."""
+
+import zlib
+import struct
+import numpy
+
+SIGNATURE = '\x89PNG\r\n\x1a\n'
+
+
+class PNGWriter:
+	"""Writes the 8 bit RGB image of SIZE (width, height) pixels to the
+	open binary file FILE, row by row from the top, compressing as it
+	goes.  LEVEL is the zlib compression level (default 6)."""
+
+	def __init__(self, file, size, level = None):
+		if level is None:
+			level = 6
+
+		self.file = file
+		(self.width, self.height) = size
+		self.rows = 0
+		self.compressor = zlib.compressobj(level)
+
+		self.file.write(SIGNATURE)
+		# Bit depth 8, colour type 2 (RGB), standard compression and
+		# filtering, no interlace.
+		self.write_chunk('IHDR', struct.pack('>IIBBBBB',
+				self.width, self.height, 8, 2, 0, 0, 0))
+
+	def write_chunk(self, kind, data):
+		self.file.write(struct.pack('>I', len(data)))
+		self.file.write(kind)
+		self.file.write(data)
+		self.file.write(struct.pack('>I',
+				zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+	def write_rows(self, rgb):
+		"""Append the rows of RGB, an array of shape (rows, width, 3) and
+		dtype uint8 (or convertible)."""
+
+		rgb = numpy.asarray(rgb)
+		(nrows, width) = rgb.shape[:2]
+		if width != self.width or rgb.shape[2:] != (3,):
+			raise ValueError('rows must be of shape (%d, 3)' % self.width)
+		if self.rows + nrows > self.height:
+			raise ValueError('more rows than the image height')
+
+		# Each row starts with its filter type, 0 (none).
+		filtered = numpy.zeros((nrows, 1 + 3 * width), dtype = numpy.uint8)
+		filtered[:, 1:] = rgb.reshape((nrows, 3 * width))
+		self.write_data(self.compressor.compress(filtered.tostring()))
+		self.rows += nrows
+
+	def write_data(self, data):
+		if data:
+			self.write_chunk('IDAT', data)
+
+	def close(self):
+		"""Finish the image.  Does not close FILE."""
+
+		if self.rows != self.height:
+			raise ValueError('%d of %d rows written' %
+					(self.rows, self.height))
+		self.write_data(self.compressor.flush())
+		self.write_chunk('IEND', '')
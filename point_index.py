@@ -0,0 +1,205 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import math
+import numpy
+
+
+class PointIndex:
+	"""Nearest point queries on points (x, y) in time proportional to the
+	number of points near the query.  The points are bucketed in a grid
+	of cells holding about DENSITY (default 8) points each, and stored
+	sorted by cell, so that a row of cells is one slice.  Points are
+	numbered in the order added, starting from START (default 0).
+
+	Appended points are kept in a tail, searched linearly, until it
+	exceeds tail_limit points; then they are merged into the grid.  The
+	grid is laid out anew when it has doubled since, or when half of it
+	has been dropped."""
+
+	tail_limit = 16384
+
+	def __init__(self, x = None, y = None, start = None, density = None):
+		if start is None:
+			start = 0
+		if density is None:
+			density = 8
+
+		self.density = density
+		self.count = start
+		self.first = start
+
+		# The grid: coordinates, numbers and cells of the points sorted by
+		# cell, and the start of each cell in them.
+		self.x = numpy.zeros(0)
+		self.y = numpy.zeros(0)
+		self.numbers = numpy.zeros(0, dtype = int)
+		self.cells = numpy.zeros(0, dtype = int)
+		self.starts = numpy.zeros(1, dtype = int)
+		self.shape = (0, 0)
+		self.origin = (0.0, 0.0)
+		self.cell = (1.0, 1.0)
+
+		# Size and lowest number at the last layout, and points merged
+		# since.
+		self.built_size = 0
+		self.built_first = start
+		self.merged = 0
+
+		self.tail = []
+		self.tail_size = 0
+
+		if x is not None:
+			self.append(x, y)
+			self.rebuild()
+
+	def __len__(self):
+		return self.count - self.first
+
+	def append(self, x, y):
+		x = numpy.atleast_1d(numpy.asarray(x, dtype = float))
+		y = numpy.atleast_1d(numpy.asarray(y, dtype = float))
+		if x.shape != y.shape or x.ndim != 1:
+			raise ValueError('X and Y must be 1d arrays of the same length')
+		numbers = numpy.arange(self.count, self.count + len(x))
+		self.tail.append((x.copy(), y.copy(), numbers))
+		self.tail_size += len(x)
+		self.count += len(x)
+
+	def drop(self, first):
+		"""Forget the points numbered below FIRST."""
+
+		self.first = max(self.first, first)
+
+	def take_tail(self):
+		"""Remove the tail, returning its valid points."""
+
+		parts = self.tail
+		(self.tail, self.tail_size) = ([], 0)
+		if not parts:
+			return (numpy.zeros(0), numpy.zeros(0), numpy.zeros(0, dtype = int))
+		x = numpy.concatenate([part[0] for part in parts])
+		y = numpy.concatenate([part[1] for part in parts])
+		numbers = numpy.concatenate([part[2] for part in parts])
+		keep = (numbers >= self.first) & numpy.isfinite(x) & \
+				numpy.isfinite(y)
+		return (x[keep], y[keep], numbers[keep])
+
+	def update(self):
+		"""Bring the tail into the grid."""
+
+		dropped = min(max(self.first - self.built_first, 0), self.built_size)
+		if self.merged + self.tail_size > self.built_size or \
+				dropped > self.built_size // 2:
+			self.rebuild()
+		else:
+			self.merge()
+
+	def merge(self):
+		"""Insert the tail into the grid as it is laid out, in time linear
+		in the size of the grid."""
+
+		(x, y, numbers) = self.take_tail()
+		cells = self.get_cells(x, y)
+		order = cells.argsort()
+		(x, y, numbers, cells) = \
+				(x[order], y[order], numbers[order], cells[order])
+		positions = self.cells.searchsorted(cells, side = 'right')
+		self.x = numpy.insert(self.x, positions, x)
+		self.y = numpy.insert(self.y, positions, y)
+		self.numbers = numpy.insert(self.numbers, positions, numbers)
+		self.cells = numpy.insert(self.cells, positions, cells)
+		self.starts += cells.searchsorted(numpy.arange(len(self.starts)))
+		self.merged += len(x)
+
+	def rebuild(self):
+		"""Lay out a new grid fitting the bounds of all points."""
+
+		(x, y, numbers) = self.take_tail()
+		keep = self.numbers >= self.first
+		x = numpy.concatenate((self.x[keep], x))
+		y = numpy.concatenate((self.y[keep], y))
+		numbers = numpy.concatenate((self.numbers[keep], numbers))
+
+		side = max(int(math.sqrt(len(x) / float(self.density))), 1)
+		self.shape = (side, side)
+		if len(x):
+			self.origin = (x.min(), y.min())
+			self.cell = (max((x.max() - self.origin[0]) / side, 1e-300),
+					max((y.max() - self.origin[1]) / side, 1e-300))
+		cells = self.get_cells(x, y)
+		order = cells.argsort()
+		(self.x, self.y, self.numbers, self.cells) = \
+				(x[order], y[order], numbers[order], cells[order])
+		self.starts = self.cells.searchsorted(numpy.arange(side * side + 1))
+		self.built_size = len(x)
+		self.built_first = self.first
+		self.merged = 0
+
+	def get_grid_position(self, x, y):
+		"""Columns and rows of the cells of X, Y, clipped to the grid."""
+
+		columns = numpy.clip(((numpy.asarray(x) - self.origin[0]) /
+				self.cell[0]).astype(int), 0, self.shape[0] - 1)
+		rows = numpy.clip(((numpy.asarray(y) - self.origin[1]) /
+				self.cell[1]).astype(int), 0, self.shape[1] - 1)
+		return (columns, rows)
+
+	def get_cells(self, x, y):
+		(columns, rows) = self.get_grid_position(x, y)
+		return rows * self.shape[0] + columns
+
+	def nearest(self, x, y, radius):
+		"""Return (distance, number, x, y) of the point nearest to (X, Y)
+		within RADIUS (rx, ry), the distance being measured in units of
+		RADIUS, e.g. in pixels if RADIUS is the size of a pixel in data
+		units.  None if there is no point within distance 1."""
+
+		if self.tail_size > self.tail_limit:
+			self.update()
+		(rx, ry) = radius
+
+		candidates = list(self.tail)
+		if len(self.numbers):
+			((column0, column1), (row0, row1)) = self.get_grid_position(
+					(x - rx, x + rx), (y - ry, y + ry))
+			for row in xrange(row0, row1 + 1):
+				begin = self.starts[row * self.shape[0] + column0]
+				end = self.starts[row * self.shape[0] + column1 + 1]
+				if end > begin:
+					candidates.append((self.x[begin:end], self.y[begin:end],
+							self.numbers[begin:end]))
+		if not candidates:
+			return None
+
+		xs = numpy.concatenate([part[0] for part in candidates])
+		ys = numpy.concatenate([part[1] for part in candidates])
+		numbers = numpy.concatenate([part[2] for part in candidates])
+		if not len(xs):
+			return None
+		distances = ((xs - x) / rx) ** 2 + ((ys - y) / ry) ** 2
+		distances[(numbers < self.first) | numpy.isnan(distances)] = \
+				numpy.inf
+		index = distances.argmin()
+		if not distances[index] <= 1:
+			return None
+		return (math.sqrt(distances[index]), numbers[index],
+				xs[index], ys[index])
@@ -0,0 +1,307 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import math
+import mmap
+import shutil
+import tempfile
+import numpy
+import numpy.lib.format
+
+
+class MinMaxPyramid:
+	"""Level-of-detail representation of a line Y(X) with X ascending.
+	Level K holds the minimum and maximum of Y over blocks of FACTOR ** K
+	samples, so that any view can be drawn with about two points per
+	pixel column.  NaN samples (gaps) are left out of the blocks."""
+
+	def __init__(self, x, y, factor = None):
+		if factor is None:
+			factor = 4
+
+		x = numpy.asarray(x, dtype = float)
+		y = numpy.asarray(y, dtype = float)
+		if x.shape != y.shape or x.ndim != 1:
+			raise ValueError('X and Y must be 1d arrays of the same length')
+
+		self.factor = factor
+		self.x = x
+
+		# Each level is (block size, block x, block minimum, block maximum).
+		self.levels = [(1, x, y, y)]
+		(block, xs, ymins, ymaxs) = self.levels[0]
+		while len(xs) > factor:
+			block *= factor
+			xs = xs[::factor]
+			# fmin() and fmax() take NaN only if both values are NaN.
+			ymins = self._reduce(ymins, numpy.fmin)
+			ymaxs = self._reduce(ymaxs, numpy.fmax)
+			self.levels.append((block, xs, ymins, ymaxs))
+
+	def _reduce(self, values, ufunc):
+		"""Reduce VALUES with UFUNC over blocks of SELF.FACTOR, the last
+		block being padded with its last value."""
+
+		remainder = len(values) % self.factor
+		if remainder:
+			values = numpy.concatenate((values,
+					numpy.repeat(values[-1:], self.factor - remainder)))
+		return ufunc.reduce(values.reshape((-1, self.factor)), axis = 1)
+
+	def get_bounds(self):
+		"""Return ((xmin, xmax), (ymin, ymax)) of the whole data, or None
+		if Y is all NaN."""
+
+		(block, xs, ymins, ymaxs) = self.levels[-1]
+		if numpy.isnan(ymins).all():
+			return None
+		return ((self.x[0], self.x[-1]),
+				(numpy.nanmin(ymins), numpy.nanmax(ymaxs)))
+
+	def query(self, xlim, npixels):
+		"""Return (level, x, y) to draw the range XLIM on NPIXELS pixel
+		columns.  One sample beyond XLIM is included on each side, so that
+		the line runs up to the edges of the axes."""
+
+		(xlow, xhigh) = (min(xlim), max(xlim))
+		start = max(self.x.searchsorted(xlow) - 1, 0)
+		stop = min(self.x.searchsorted(xhigh, side = 'right') + 1,
+				len(self.x))
+		npixels = max(int(npixels), 1)
+
+		# Raw samples as long as they are not more than two per pixel,
+		# else the finest level with at most one block per pixel.
+		if stop - start <= 2 * npixels:
+			return (0, self.x[start:stop], self.levels[0][2][start:stop])
+
+		for (level, (block, xs, ymins, ymaxs)) in enumerate(self.levels):
+			first = start // block
+			last = -(-stop // block)
+			if last - first <= npixels or level == len(self.levels) - 1:
+				break
+
+		# Alternate minimum and maximum at each block position, so that
+		# the line sweeps over the whole envelope.
+		x = numpy.repeat(xs[first:last], 2)
+		y = numpy.empty(len(x))
+		y[0::2] = ymins[first:last]
+		y[1::2] = ymaxs[first:last]
+		return (level, x, y)
+
+
+class ImagePyramid:
+	"""Level-of-detail representation of the 2d array DATA, row 0 at the
+	bottom, covering EXTENT (left, right, bottom, top), by default (0,
+	columns, 0, rows).  Level K holds the mean (or, with REDUCTION 'max',
+	the maximum) of blocks of 2 ** K by 2 ** K values, NaN being left
+	out, so that any view can be drawn from about one value per pixel.
+	With DIRECTORY, the levels are memory mapped .npy files in a new
+	subdirectory of it, so that pyramids may share DIRECTORY, instead of
+	arrays in memory; DATA may be a numpy.memmap as well.  The
+	subdirectory is deleted by close().  Memory mapped levels are
+	pickled as their files, which the copy maps again read-only; the
+	files stay with the original.  VMIN and VMAX are the range of DATA
+	without NaN, None if it is all NaN."""
+
+	def __init__(self, data, extent = None, reduction = None,
+			directory = None):
+		if reduction is None:
+			reduction = 'mean'
+		if reduction not in ('mean', 'max'):
+			raise ValueError('REDUCTION must be "mean" or "max"')
+		if numpy.ndim(data) != 2:
+			raise ValueError('DATA must be a 2d array')
+		if not isinstance(data, numpy.ndarray):
+			data = numpy.asarray(data)
+
+		(rows, columns) = data.shape
+		if extent is None:
+			extent = (0, columns, 0, rows)
+		self.extent = tuple([float(value) for value in extent])
+		self.reduction = reduction
+		if directory is not None:
+			directory = tempfile.mkdtemp(prefix = 'pyramid-', dir = directory)
+		self.directory = directory
+		self.vmin = None
+		self.vmax = None
+
+		self.levels = [data]
+		level = data
+		while max(level.shape) > 1:
+			level = self._reduce(level, len(self.levels))
+			self.levels.append(level)
+		if len(self.levels) == 1:
+			# Not reduced, which finds the range on the way.
+			self._update_range(numpy.asarray(data))
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		levels = []
+		for level in self.levels:
+			# Only a memmap of its own, not a view of one, knows its offset
+			# in the file.
+			if isinstance(level, numpy.memmap) and \
+					isinstance(level.base, mmap.mmap):
+				level.flush()
+				if level.flags.f_contiguous and not level.flags.c_contiguous:
+					order = 'F'
+				else:
+					order = 'C'
+				level = (level.filename, level.dtype, level.offset,
+						level.shape, order)
+			levels.append(level)
+		state.update(levels = levels, directory = None)
+		return state
+
+	def __setstate__(self, state):
+		levels = []
+		for level in state['levels']:
+			if isinstance(level, tuple):
+				(filename, dtype, offset, shape, order) = level
+				level = numpy.memmap(filename, dtype = dtype, mode = 'r',
+						offset = offset, shape = shape, order = order)
+			levels.append(level)
+		self.__dict__.update(state)
+		self.levels = levels
+
+	def close(self):
+		"""Delete the subdirectory of DIRECTORY holding the levels, if
+		any.  The pyramid cannot be queried afterwards."""
+
+		if self.directory is not None:
+			# Level 0 is DATA, which is not in the subdirectory.
+			self.levels = self.levels[:1]
+			shutil.rmtree(self.directory, ignore_errors = True)
+			self.directory = None
+
+	def _update_range(self, block):
+		"""Widen VMIN, VMAX to the values of BLOCK which are not NaN."""
+
+		if block.dtype.kind in 'fc':
+			block = block[~numpy.isnan(block)]
+		if not block.size:
+			return
+		(low, high) = (block.min(), block.max())
+		if self.vmin is None:
+			(self.vmin, self.vmax) = (low, high)
+		else:
+			self.vmin = min(self.vmin, low)
+			self.vmax = max(self.vmax, high)
+
+	def _allocate(self, index, shape, dtype):
+		if self.directory is None:
+			return numpy.empty(shape, dtype = dtype)
+		return numpy.lib.format.open_memmap(
+				os.path.join(self.directory, 'level%d.npy' % index),
+				mode = 'w+', dtype = dtype, shape = shape)
+
+	def _reduce(self, source, index):
+		"""Level INDEX from SOURCE, the level before, the last row and
+		column being repeated for odd sizes.  Works through SOURCE in
+		chunks of rows, so that memory mapped levels are not loaded
+		whole."""
+
+		(rows, columns) = source.shape
+		if self.reduction == 'mean':
+			dtype = numpy.float32
+		else:
+			dtype = source.dtype
+		target = self._allocate(index,
+				(-(-rows // 2), -(-columns // 2)), dtype)
+
+		# An even number of rows, about 16 M values per chunk.
+		chunk = max(2 ** 24 // max(columns, 1) // 2 * 2, 2)
+		for start in xrange(0, rows, chunk):
+			block = numpy.asarray(source[start:start + chunk])
+			if index == 1:
+				self._update_range(block)
+			if len(block) % 2:
+				block = numpy.concatenate((block, block[-1:]))
+			if block.shape[1] % 2:
+				block = numpy.concatenate((block, block[:, -1:]), axis = 1)
+			block = block.reshape((len(block) // 2, 2,
+					block.shape[1] // 2, 2))
+			if self.reduction == 'max':
+				# fmax() takes NaN only if both values are NaN.
+				reduced = numpy.fmax.reduce(
+						numpy.fmax.reduce(block, axis = 3), axis = 1)
+			elif block.dtype.kind in 'fc':
+				valid = ~numpy.isnan(block)
+				counts = valid.sum(axis = 3).sum(axis = 1)
+				reduced = numpy.where(valid, block, 0).sum(axis = 3).sum(
+						axis = 1) / numpy.maximum(counts, 1)
+				reduced[counts == 0] = numpy.nan
+			else:
+				reduced = block.mean(axis = 3).mean(axis = 1)
+			target[start // 2:start // 2 + len(reduced)] = reduced
+		return target
+
+	def get_bounds(self):
+		"""Return ((xmin, xmax), (ymin, ymax)) of the extent."""
+
+		(left, right, bottom, top) = self.extent
+		return ((min(left, right), max(left, right)),
+				(min(bottom, top), max(bottom, top)))
+
+	def query(self, xlim, ylim, shape):
+		"""Return (level, array, extent) to show the range XLIM, YLIM on
+		SHAPE (width, height) pixels: the part of the finest level with at
+		most about one value per pixel in view, with a margin of one
+		value, and the extent of that part."""
+
+		(left, right, bottom, top) = self.extent
+		(rows, columns) = self.levels[0].shape
+		cell = ((right - left) / columns, (top - bottom) / rows)
+
+		# Values of level 0 per pixel, in the denser direction.
+		density = max(
+				abs(xlim[1] - xlim[0]) / abs(cell[0]) / max(shape[0], 1),
+				abs(ylim[1] - ylim[0]) / abs(cell[1]) / max(shape[1], 1))
+		level = 0
+		while level < len(self.levels) - 1 and 2 ** (level + 1) <= density:
+			level += 1
+
+		data = self.levels[level]
+		block = 2 ** level
+		(width, height) = (cell[0] * block, cell[1] * block)
+		(column0, column1) = self._get_range(xlim, left, width, data.shape[1])
+		(row0, row1) = self._get_range(ylim, bottom, height, data.shape[0])
+
+		# The last value of a level may cover less than a block; its outer
+		# edge is the edge of the extent.
+		extent = (left + column0 * width, left + column1 * width,
+				bottom + row0 * height, bottom + row1 * height)
+		if column1 == data.shape[1]:
+			extent = (extent[0], right) + extent[2:]
+		if row1 == data.shape[0]:
+			extent = extent[:3] + (top,)
+		return (level, numpy.asarray(data[row0:row1, column0:column1]),
+				extent)
+
+	def _get_range(self, lim, origin, size, count):
+		"""The indices [first, last) of the values of SIZE from ORIGIN
+		covering LIM, with a margin of one, and at least one value."""
+
+		positions = sorted([(value - origin) / size for value in lim])
+		first = min(max(int(math.floor(positions[0])) - 1, 0), count - 1)
+		last = max(min(int(math.ceil(positions[1])) + 1, count), first + 1)
+		return (first, last)
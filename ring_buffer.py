@@ -0,0 +1,142 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import numpy
+
+
+def get_range(values):
+	"""(min, max) of VALUES without NaN, (nan, nan) if there is nothing
+	else."""
+
+	if numpy.isnan(values).all():
+		return (numpy.nan, numpy.nan)
+	return (numpy.nanmin(values), numpy.nanmax(values))
+
+
+class RingBuffer:
+	"""Fixed capacity buffer of the last CAPACITY (x, y) samples.
+
+	Every sample is stored twice, CAPACITY apart, so that the samples in
+	order are always a contiguous slice of the preallocated arrays and
+	can be handed to matplotlib without copying."""
+
+	def __init__(self, capacity, nblocks = None):
+		"""The bounds of the samples are kept for NBLOCKS (default 64)
+		blocks of the buffer, so that get_bounds() need not scan the
+		samples."""
+
+		if capacity < 1:
+			raise ValueError('CAPACITY must be positive')
+		if nblocks is None:
+			nblocks = 64
+		self.capacity = capacity
+		self.x = numpy.zeros(2 * capacity)
+		self.y = numpy.zeros(2 * capacity)
+
+		# The samples are at [START, START + LENGTH) of the arrays.
+		self.start = 0
+		self.length = 0
+
+		# Bounds of the samples in each block, NaN for empty blocks.
+		self.block_size = -(-capacity // nblocks)
+		nblocks = -(-capacity // self.block_size)
+		self.block_bounds = numpy.empty((4, nblocks))
+		self.block_bounds.fill(numpy.nan)
+
+	def __len__(self):
+		return self.length
+
+	def append(self, x, y):
+		"""Append the samples X, Y (scalars or 1d arrays).  Returns the
+		number of samples dropped from the start."""
+
+		x = numpy.atleast_1d(numpy.asarray(x, dtype = float))
+		y = numpy.atleast_1d(numpy.asarray(y, dtype = float))
+		if x.shape != y.shape or x.ndim != 1:
+			raise ValueError('X and Y must be 1d arrays of the same length')
+
+		count = len(x)
+		if count > self.capacity:
+			# Only the last CAPACITY samples will survive anyway.
+			(x, y) = (x[-self.capacity:], y[-self.capacity:])
+			count = self.capacity
+
+		dropped = max(self.length + count - self.capacity, 0)
+		end = (self.start + self.length) % self.capacity
+		position = 0
+		written = []
+		while position < count:
+			chunk = min(count - position, self.capacity - end)
+			for (target, source) in ((self.x, x), (self.y, y)):
+				target[end:end + chunk] = source[position:position + chunk]
+				target[end + self.capacity:end + self.capacity + chunk] = \
+						source[position:position + chunk]
+			written.append((end, end + chunk))
+			position += chunk
+			end = (end + chunk) % self.capacity
+
+		self.start = (self.start + dropped) % self.capacity
+		self.length = min(self.length + count, self.capacity)
+		for (low, high) in written:
+			self._update_blocks(low, high)
+		return dropped
+
+	def _update_blocks(self, low, high):
+		"""Recompute the bounds of the blocks overlapping [LOW, HIGH)."""
+
+		# Until the buffer is full, START is 0 and the samples are at
+		# [0, LENGTH); afterwards all of it is in use.
+		for block in xrange(low // self.block_size,
+				(high - 1) // self.block_size + 1):
+			first = block * self.block_size
+			last = min(first + self.block_size, self.length)
+			if last <= first:
+				self.block_bounds[:, block] = numpy.nan
+				continue
+			self.block_bounds[:, block] = \
+					get_range(self.x[first:last]) + \
+					get_range(self.y[first:last])
+
+	def get_bounds(self):
+		"""Return ((xmin, xmax), (ymin, ymax)) of the samples, NaN being
+		left out, or None if there are none.  Takes time in the number of
+		blocks only."""
+
+		(xmins, xmaxs, ymins, ymaxs) = self.block_bounds
+		xvalid = ~numpy.isnan(xmins)
+		yvalid = ~numpy.isnan(ymins)
+		if self.length == 0 or not xvalid.any() or not yvalid.any():
+			return None
+		return ((xmins[xvalid].min(), xmaxs[xvalid].max()),
+				(ymins[yvalid].min(), ymaxs[yvalid].max()))
+
+	def get_x(self):
+		"""The samples in order, as a view."""
+
+		return self.x[self.start:self.start + self.length]
+
+	def get_y(self):
+		return self.y[self.start:self.start + self.length]
+
+	def clear(self):
+		self.start = 0
+		self.length = 0
+		self.block_bounds.fill(numpy.nan)
@@ -0,0 +1,92 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+import matplotlib_backend_fr.figure_axes
+
+
+class ToEpsFileTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.figure_axes = matplotlib_backend_fr.figure_axes.FigureAxes()
+		with self.figure_axes.batch():
+			self.figure_axes.set_xlim((0, 1))
+			self.figure_axes.set_ylim((0, 1))
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def get_eps(self):
+		filename = os.path.join(self.directory, 'figure.eps')
+		self.figure_axes.to_eps_file(filename, (4, 3))
+		eps = open(filename)
+		try:
+			return eps.read()
+		finally:
+			eps.close()
+
+	def test_layer(self):
+		empty = self.get_eps()
+		x = numpy.linspace(0, 1, 2000)
+		self.figure_axes.add_layer('line',
+				self.figure_axes.axes.plot(x, x ** 2))
+		self.assert_(len(self.get_eps()) > len(empty) + 10000)
+
+	def test_decimated_line(self):
+		empty = self.get_eps()
+		random = numpy.random.RandomState(0)
+		self.figure_axes.add_decimated_line('line',
+				numpy.linspace(0, 1, 10 ** 5), random.random_sample(10 ** 5))
+		# The frame drawn before must not limit the print to its level.
+		self.figure_axes.to_image((100, 100))
+		self.assert_(len(self.get_eps()) > len(empty) + 10 ** 5)
+
+	def test_layers_stay_animated(self):
+		(line,) = self.figure_axes.axes.plot([0, 1], [0, 1])
+		self.figure_axes.add_layer('line', [line])
+		self.get_eps()
+		self.assert_(line.get_animated())
+
+class HeatmapTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.figure_axes = matplotlib_backend_fr.figure_axes.FigureAxes()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_strips_query_their_part(self):
+		layer = self.figure_axes.add_heatmap('heatmap',
+				numpy.random.RandomState(0).random_sample((2000, 2000)))
+		self.figure_axes.to_png_file_strips(
+				os.path.join(self.directory, 'poster.png'), (2000, 2000),
+				strip_height = 100)
+		(rows, columns) = layer.image.get_array().shape
+		self.assert_(rows < 2 * 100)
+		self.assert_(columns > 1000)
+
+if __name__ == '__main__':
+	unittest.main()
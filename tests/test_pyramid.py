@@ -0,0 +1,86 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import numpy
+
+import matplotlib_backend_fr.pyramid
+
+
+class MinMaxPyramidTest(unittest.TestCase):
+	def test_nan_left_out(self):
+		y = numpy.arange(64, dtype = float)
+		y[[0, 17, 63]] = numpy.nan
+		pyramid = matplotlib_backend_fr.pyramid.MinMaxPyramid(
+				numpy.arange(64), y)
+		self.assertEqual(pyramid.get_bounds(), ((0, 63), (1, 62)))
+		for (block, xs, ymins, ymaxs) in pyramid.levels[1:]:
+			self.failIf(numpy.isnan(ymins).any())
+			self.failIf(numpy.isnan(ymaxs).any())
+
+	def test_all_nan(self):
+		y = numpy.empty(20)
+		y.fill(numpy.nan)
+		pyramid = matplotlib_backend_fr.pyramid.MinMaxPyramid(
+				numpy.arange(20), y)
+		self.assertEqual(pyramid.get_bounds(), None)
+
+class ImagePyramidTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_nan_mean(self):
+		data = numpy.array([[1.0, numpy.nan, numpy.nan],
+				[3.0, numpy.nan, numpy.nan]])
+		pyramid = matplotlib_backend_fr.pyramid.ImagePyramid(data)
+		self.assertEqual(pyramid.levels[1][0, 0], 2.0)
+		self.assert_(numpy.isnan(pyramid.levels[1][0, 1]))
+		self.assertEqual(pyramid.levels[-1][0, 0], 2.0)
+
+	def test_pickle_maps_files(self):
+		data = numpy.arange(64.0).reshape((8, 8))
+		pyramid = matplotlib_backend_fr.pyramid.ImagePyramid(data,
+				directory = self.directory)
+		copy = pickle.loads(pickle.dumps(pyramid, pickle.HIGHEST_PROTOCOL))
+		for (level, copied) in zip(pyramid.levels[1:], copy.levels[1:]):
+			self.assert_(isinstance(copied, numpy.memmap))
+			self.assert_((numpy.asarray(level) == copied).all())
+		# The files stay with the original.
+		copy.close()
+		self.assert_(os.path.isdir(pyramid.directory))
+
+	def test_close(self):
+		pyramid = matplotlib_backend_fr.pyramid.ImagePyramid(
+				numpy.ones((8, 8)), directory = self.directory)
+		subdirectory = pyramid.directory
+		pyramid.close()
+		self.failIf(os.path.exists(subdirectory))
+		self.assertEqual(os.listdir(self.directory), [])
+
+if __name__ == '__main__':
+	unittest.main()
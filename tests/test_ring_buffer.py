@@ -0,0 +1,51 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import unittest
+import numpy
+
+import matplotlib_backend_fr.ring_buffer
+
+
+class BoundsTest(unittest.TestCase):
+	def test_nan_left_out(self):
+		ring_buffer = matplotlib_backend_fr.ring_buffer.RingBuffer(16,
+				nblocks = 4)
+		ring_buffer.append([0, 1, 2, 3], [5, numpy.nan, -1, 2])
+		self.assertEqual(ring_buffer.get_bounds(), ((0, 3), (-1, 5)))
+
+	def test_nan_first(self):
+		ring_buffer = matplotlib_backend_fr.ring_buffer.RingBuffer(16,
+				nblocks = 4)
+		ring_buffer.append(0, numpy.nan)
+		self.assertEqual(ring_buffer.get_bounds(), None)
+		ring_buffer.append(1, 4)
+		self.assertEqual(ring_buffer.get_bounds(), ((0, 1), (4, 4)))
+
+	def test_nan_in_every_block(self):
+		ring_buffer = matplotlib_backend_fr.ring_buffer.RingBuffer(8,
+				nblocks = 4)
+		ring_buffer.append(numpy.arange(12),
+				[numpy.nan, 1] * 6)
+		self.assertEqual(ring_buffer.get_bounds(), ((4, 11), (1, 1)))
+
+if __name__ == '__main__':
+	unittest.main()
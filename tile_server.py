@@ -0,0 +1,223 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""Serve a FigureAxes as a pyramid of PNG tiles over HTTP.
+
+Tile (Z, X, Y) is one of 2 ** Z by 2 ** Z tiles covering the limits of the
+figure, with X counted from the left and Y from the top, and is served as
+/Z/X/Y.png.  Tiles show the data area only, without axis decorations.
+
+Command line:
+
+python -m matplotlib_backend_fr.tile_server [-p PROCESSES] [--port PORT]
+		SPEC
+
+SPEC is as for matplotlib_backend_fr.export."""
+
+import re
+import optparse
+import threading
+import multiprocessing
+import StringIO
+import SocketServer
+import BaseHTTPServer
+
+import matplotlib_backend_fr.cache
+import matplotlib_backend_fr.export
+
+
+# The figure of a worker process, its limits, and the tile size.
+_worker_state = {}
+
+def _init_worker(spec, tile_size):
+	figure_axes = matplotlib_backend_fr.export.build_figure_axes(spec)
+	_worker_state['world'] = (figure_axes.get_xlim(), figure_axes.get_ylim())
+
+	# The data area fills the tile.
+	figure_axes.axes.set_position((0, 0, 1, 1))
+	figure_axes.axes.set_axis_off()
+	figure_axes.invalidate()
+
+	_worker_state['figure_axes'] = figure_axes
+	_worker_state['tile_size'] = tile_size
+
+def _get_world():
+	return _worker_state['world']
+
+def _render_tile(xlim, ylim):
+	figure_axes = _worker_state['figure_axes']
+	tile_size = _worker_state['tile_size']
+	figure_axes.set_xlim(xlim)
+	figure_axes.set_ylim(ylim)
+	image = figure_axes.to_image((tile_size, tile_size))
+	output = StringIO.StringIO()
+	image.save(output, 'PNG')
+	return output.getvalue()
+
+
+class TileRenderer:
+	"""Renders tiles of FIGURE (a FigureAxes or a picklable callable
+	returning one) on PROCESSES worker processes, keeping up to
+	CACHE_BYTES of PNG data.  Requests for a tile being rendered wait for
+	that render."""
+
+	def __init__(self, figure, processes = None, cache_bytes = None,
+			tile_size = None):
+		if cache_bytes is None:
+			cache_bytes = 256 * 2 ** 20
+		if tile_size is None:
+			tile_size = 256
+
+		self.tile_size = tile_size
+		self.pool = multiprocessing.Pool(processes,
+				initializer = _init_worker,
+				initargs = (matplotlib_backend_fr.export.make_spec(figure),
+					tile_size))
+		self.world = self.pool.apply(_get_world)
+		self.cache = matplotlib_backend_fr.cache.LRUCache(cache_bytes)
+		self.pending = {}
+		self.lock = threading.Lock()
+
+	def get_limits(self, z, x, y):
+		"""Return (xlim, ylim) of tile (Z, X, Y)."""
+
+		count = 2 ** z
+		if not (0 <= x < count and 0 <= y < count):
+			raise ValueError('no tile (%d, %d, %d)' % (z, x, y))
+		((x0, x1), (y0, y1)) = self.world
+		(width, height) = \
+				((x1 - x0) / float(count), (y1 - y0) / float(count))
+		return ((x0 + x * width, x0 + (x + 1) * width),
+				(y1 - (y + 1) * height, y1 - y * height))
+
+	def get_tile(self, z, x, y):
+		"""Return the PNG data of tile (Z, X, Y)."""
+
+		key = (z, x, y)
+		png = self.cache.get(key)
+		if png is not None:
+			return png
+
+		self.lock.acquire()
+		try:
+			# It may have been finished since.
+			png = self.cache.get(key)
+			if png is not None:
+				return png
+			result = self.pending.get(key)
+			if result is None:
+				result = self.pool.apply_async(_render_tile,
+						self.get_limits(z, x, y))
+				self.pending[key] = result
+		finally:
+			self.lock.release()
+
+		try:
+			png = result.get()
+		except:
+			self.finish(key, result, None)
+			raise
+		self.finish(key, result, png)
+		return png
+
+	def finish(self, key, result, png):
+		"""Move the tile KEY from the pending RESULT to the cache, or just
+		drop it if rendering failed (PNG None), so that it is tried
+		again.  Both in one step, so that no request finds neither."""
+
+		self.lock.acquire()
+		try:
+			if png is not None:
+				self.cache.put(key, png, len(png))
+			if self.pending.get(key) is result:
+				del self.pending[key]
+		finally:
+			self.lock.release()
+
+	def close(self):
+		self.pool.close()
+		self.pool.join()
+
+
+class TileRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	tile_path = re.compile(r'^/(\d+)/(\d+)/(\d+)\.png$')
+
+	def do_GET(self):
+		match = self.tile_path.match(self.path)
+		if match is None:
+			self.send_error(404)
+			return
+		(z, x, y) = [int(value) for value in match.groups()]
+		try:
+			self.server.renderer.get_limits(z, x, y)
+		except ValueError:
+			self.send_error(404)
+			return
+		try:
+			png = self.server.renderer.get_tile(z, x, y)
+		except Exception, error:
+			self.log_error('rendering tile %s failed: %r', self.path, error)
+			self.send_error(500)
+			return
+
+		self.send_response(200)
+		self.send_header('Content-Type', 'image/png')
+		self.send_header('Content-Length', str(len(png)))
+		self.end_headers()
+		self.wfile.write(png)
+
+
+class TileServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	"""HTTP server for the tiles of RENDERER, a TileRenderer, at
+	ADDRESS, a (host, port) tuple."""
+
+	daemon_threads = True
+
+	def __init__(self, address, renderer):
+		BaseHTTPServer.HTTPServer.__init__(self, address, TileRequestHandler)
+		self.renderer = renderer
+
+
+def main(argv = None):
+	parser = optparse.OptionParser(
+			usage = '%prog [-p PROCESSES] [--port PORT] SPEC')
+	parser.add_option('-p', '--processes', type = 'int', default = None,
+			help = 'number of worker processes (default: one per CPU)')
+	parser.add_option('--host', default = 'localhost')
+	parser.add_option('--port', type = 'int', default = 8000)
+	parser.add_option('--cache-mb', type = 'int', default = 256,
+			help = 'size bound of the tile cache')
+	(options, args) = parser.parse_args(argv)
+	if len(args) != 1:
+		parser.error('SPEC is required')
+
+	renderer = TileRenderer(
+			matplotlib_backend_fr.export.load_spec(args[0]),
+			processes = options.processes,
+			cache_bytes = options.cache_mb * 2 ** 20)
+	server = TileServer((options.host, options.port), renderer)
+	try:
+		server.serve_forever()
+	finally:
+		renderer.close()
+
+if __name__ == '__main__':
+	main()
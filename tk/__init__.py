@@ -2,3 +2,4 @@ from matplotlib_backend_fr.tk.panel_figure_axes import \
 		PanelFigureAxes, SettingsDialog
 from matplotlib_backend_fr.tk.kernel_figure_axes import \
 		KernelFigureAxes
+from matplotlib_backend_fr.tk.view_group import ViewGroup
@@ -23,6 +23,9 @@
 # Developed since: Mar 2010
 # File version: 0.1.0b
 
+import time
+import cPickle as pickle
+
 # Try to support several output formats ...
 
 try:
@@ -30,18 +33,27 @@ try:
 except:
 	pass
 
+import matplotlib_backend_fr.navigation
+import matplotlib_backend_fr.interaction_trace
+import matplotlib_backend_fr.export
 import matplotlib_backend_fr.tk.panel_figure_axes
 
 
-class KernelFigureAxes:
+class KernelFigureAxes(matplotlib_backend_fr.navigation.Navigation):
 	"""Performs printing and scaling of a figure."""
 
-	def __init__(self, master, figure_axes, shape = None):
+	def __init__(self, master, figure_axes, shape = None, frame_rate = None,
+			preview = None, threaded = None, progressive = None):
 		"""FIGURE_AXES is an matplotlib_backend_fr.figure_axes.FigureAxes 
-		instance.  SHAPE is the initial shape of the panel."""
+		instance.  SHAPE is the initial shape of the panel.  FRAME_RATE
+		limits the renders per second during zooming and panning.  With
+		PREVIEW, drags transform the last frame and render on release.
+		With THREADED, frames are rendered in a background thread.  With
+		PROGRESSIVE, drags are rendered at reduced resolution."""
 
+		matplotlib_backend_fr.navigation.Navigation.__init__(self,
+				figure_axes)
 		self.master = master
-		self.figure_axes = figure_axes
 		self.panel = matplotlib_backend_fr.tk.panel_figure_axes.\
 				PanelFigureAxes(
 					master = master,
@@ -51,90 +63,160 @@ class KernelFigureAxes:
 					event_handler_pan = self.pan,
 					event_handler_doubleclick_left = self.autozoom,
 					event_handler_doubleclick_right = self.open_settings_dialog,
-					image_generator = self.figure_axes.to_image,
-					shape = shape)
+					image_generator = self.render,
+					shape = shape,
+					frame_rate = frame_rate,
+					preview = preview,
+					threaded = threaded,
+					progressive = progressive,
+					timing_source = self.get_render_timing,
+					image_release = self.figure_axes.release_image,
+					event_handler_hover = self.hover)
+
+		# Rolling frame timings, see matplotlib_backend_fr.frame_stats.
+		self.stats = self.panel.stats
+
+		self.live_after_id = None
+		self.live_interval = None
+
+		# Set by every change of the figure_axes, in any thread, and
+		# cleared when a render starts.
+		self.changed = False
+		self.figure_axes.add_invalidation_hook(self.figure_axes_changed)
+
+		self.replay_after_id = None
+
+		# See matplotlib_backend_fr.tk.view_group.
+		self.view_group = None
+
+		# Pick radius of the hover readout in pixels, None when off.
+		self.hover_radius = None
 
 	def update(self):
+		self.limits_changed()
 		self.panel.update()
 
-	def _map_to_axes_coords(self, disp_coords):
-		bbox = self.figure_axes.axes.get_position()
-		axes_position = \
-				(bbox.x0, bbox.y0, bbox.size[0], bbox.size[1]) # (l,b,w,h)
-		return ((disp_coords[0] - axes_position[0]) / axes_position[2],
-				(disp_coords[1] - axes_position[1]) / axes_position[3])
-	
-	def _map_to_data_coords(self, axes_coords):
-		lims = [self.figure_axes.get_xlim(), self.figure_axes.get_ylim()]
-		return (lims[0][0] + (lims[0][1] - lims[0][0]) * axes_coords[0],
-				lims[1][0] + (lims[1][1] - lims[1][0]) * axes_coords[1])
-
-	def start_zoom(self, disp_coords):
-		"""Initialse zooming with DISP_COORDS invariant."""
-
-		lims = [self.figure_axes.get_xlim(), self.figure_axes.get_ylim()]
-		bbox = self.figure_axes.axes.get_position()
-		axes_position = \
-				(bbox.x0,bbox.y0, bbox.size[0], bbox.size[1]) # (l,b,w,h)
-		axes_coords = self._map_to_axes_coords(disp_coords)
-		self.zoom_start_position = self._map_to_data_coords(axes_coords)
-		self.zoom_original_distances=(
-				[lims[0][0] - self.zoom_start_position[0],
-				 lims[0][1] - self.zoom_start_position[0]],
-				[lims[1][0] - self.zoom_start_position[1],
-				 lims[1][1] - self.zoom_start_position[1]])
-
-	def zoom(self, (zoomx, zoomy)):
-		"""ZOOM with magnification (ZOOMX, ZOOMY)."""
-
-		zoom_new_distances=(
-				[self.zoom_original_distances[0][0] * zoomx,
-				 self.zoom_original_distances[0][1]*zoomx],
-				[self.zoom_original_distances[1][0] * zoomy,
-				 self.zoom_original_distances[1][1]*zoomy])
-		
-		zoom_new_lims=(
-				[self.zoom_start_position[0] + zoom_new_distances[0][0],
-				 self.zoom_start_position[0] + zoom_new_distances[0][1]],
-				[self.zoom_start_position[1] + zoom_new_distances[1][0],
-				 self.zoom_start_position[1] + zoom_new_distances[1][1]])
-
-		self.figure_axes.set_xlim(zoom_new_lims[0])
-		self.figure_axes.set_ylim(zoom_new_lims[1])
-
-	def start_pan(self):
-		"""Start panning."""
-
-		lims = \
-				[list(self.figure_axes.get_xlim()),
-				 list(self.figure_axes.get_ylim())]
-		self.pan_start_lims=lims
-		
-		bbox = self.figure_axes.axes.get_position()
-		axes_position = \
-				(bbox.x0, bbox.y0, bbox.size[0], bbox.size[1]) # (l,b,w,h)
-		self.pan_ratio=(
-				(lims[0][1] - lims[0][0]) / axes_position[2],
-				(lims[1][1] - lims[1][0]) / axes_position[3])
-
-	def pan(self,compensate):
-		"""Pan with COMPENSATE."""
-
-		movement=(
-				self.pan_ratio[0] * compensate[0],
-				self.pan_ratio[1] * compensate[1])
-		pan_new_lims=(
-				[self.pan_start_lims[0][0] - movement[0],
-				 self.pan_start_lims[0][1] - movement[0]],
-				[self.pan_start_lims[1][0] - movement[1],
-				 self.pan_start_lims[1][1] - movement[1]])
-		self.figure_axes.set_xlim(pan_new_lims[0])
-		self.figure_axes.set_ylim(pan_new_lims[1])
-
-	def autozoom(self):
-		"""Turn autozoom on."""
-
-		self.figure_axes.set_autoscale_on(True)
+	def limits_changed(self):
+		if self.view_group is not None:
+			self.view_group.propagate(self)
+
+	def render(self, shape, scale = None):
+		"""Image generator of the panel.  The frame is always copied: the
+		panel keeps it for the drag and resize previews, and the next
+		render or export may reuse, or replace, the Agg buffer before.
+		With a buffer pool, the copies are recycled by release_image()."""
+
+		self.changed = False
+		return self.figure_axes.to_image(shape, copy = True, scale = scale)
+
+	def figure_axes_changed(self, figure_axes):
+		self.changed = True
+
+	def get_render_timing(self):
+		"""Split of the last render into Agg draw and buffer conversion."""
+
+		return self.figure_axes.last_timing
+
+	def set_hover(self, enabled, radius = None):
+		"""Show the data point nearest to the pointer, within RADIUS pixels
+		(default 8), when ENABLED.  The indices of the points are built
+		here, see FigureAxes.pick()."""
+
+		if radius is None:
+			radius = 8
+		if enabled:
+			self.figure_axes.build_point_indices()
+			self.hover_radius = radius
+		else:
+			self.hover_radius = None
+			self.panel.hide_readout()
+
+	def hover(self, disp_coords, pixelsize):
+		if self.hover_radius is None:
+			return None
+		# Never wait for a render in progress, the next motion will tell.
+		if not self.figure_axes.lock.acquire(False):
+			return None
+		try:
+			found = self.pick(disp_coords, pixelsize, self.hover_radius)
+			if found is None:
+				return None
+			(layer, number, x, y) = found
+			return ('%s  x=%.6g  y=%.6g' % (layer.name, x, y),
+					self._map_from_data_coords((x, y)))
+		finally:
+			self.figure_axes.lock.release()
+
+	def set_overlay(self, overlay):
+		"""Show or hide the frame rate and latency readout."""
+
+		self.panel.set_overlay(overlay)
+
+	def set_live_refresh(self, rate):
+		"""Check RATE times per second whether the figure_axes changed
+		since the last render (e.g. by FigureAxes.append() in another
+		thread), and schedule a frame if so.  The frames are rate limited
+		by the panel.  None stops watching."""
+
+		if self.live_after_id is not None:
+			self.panel.canvas.after_cancel(self.live_after_id)
+			self.live_after_id = None
+		self.live_interval = None
+		if rate is not None:
+			self.live_interval = int(1000.0 / rate)
+			self.tk_live_refresh()
+
+	def tk_live_refresh(self):
+		if self.changed:
+			self.panel.schedule_update()
+		self.live_after_id = self.panel.canvas.after(
+				self.live_interval, self.tk_live_refresh)
+
+	def start_recording(self, filename):
+		"""Record the interaction with the panel to the trace file
+		FILENAME, see matplotlib_backend_fr.interaction_trace."""
+
+		self.panel.start_recording(filename)
+
+	def stop_recording(self):
+		self.panel.stop_recording()
+
+	def replay_trace(self, filename, realtime = None, hook_done = None):
+		"""Feed the events of the trace file FILENAME to the panel from the
+		Tk main loop, with the recorded delays if REALTIME is True, else
+		as fast as the main loop allows.  HOOK_DONE(SECONDS) is called
+		at the end."""
+
+		self.cancel_replay()
+		events = matplotlib_backend_fr.interaction_trace.load_trace(filename)
+		self.tk_replay(events, 0, time.time(), realtime, hook_done)
+
+	def cancel_replay(self):
+		if self.replay_after_id is not None:
+			self.panel.canvas.after_cancel(self.replay_after_id)
+			self.replay_after_id = None
+
+	def tk_replay(self, events, index, start, realtime, hook_done):
+		self.replay_after_id = None
+		if index < len(events):
+			(seconds, name, x, y) = events[index]
+			matplotlib_backend_fr.interaction_trace.dispatch(
+					self.panel, name, x, y)
+		index += 1
+		if index >= len(events):
+			if hook_done is not None:
+				hook_done(time.time() - start)
+			return
+
+		callback = lambda: self.tk_replay(
+				events, index, start, realtime, hook_done)
+		if realtime:
+			delay = start + events[index][0] - time.time()
+			self.replay_after_id = self.panel.canvas.after(
+					max(int(delay * 1000), 0), callback)
+		else:
+			# Pending frames and renders get their turn in between.
+			self.replay_after_id = self.panel.canvas.after(1, callback)
 
 	def open_settings_dialog(self):
 		"""Open the settings dialog."""
@@ -152,10 +234,30 @@ class KernelFigureAxes:
 			settingsdialog.img_ydim.set(ydim)
 
 	def save_eps(self, filename, shape):
-		self.figure_axes.to_eps_file(filename, shape)
+		return self.export(matplotlib_backend_fr.export.ExportJob(
+				filename, shape, format = 'eps'))
 
 	def save_img(self, filename, shape):
-		im = self.figure_axes.to_image_file(filename, shape)
+		return self.export(matplotlib_backend_fr.export.ExportJob(
+				filename, shape, format = 'image'))
+
+	def export(self, job):
+		"""Start JOB on a snapshot of the figure in a background process,
+		and return the matplotlib_backend_fr.export.BackgroundExport.  A
+		figure which cannot be pickled is exported right away, in its
+		current view, returning None."""
+
+		try:
+			return matplotlib_backend_fr.export.BackgroundExport(
+					self.figure_axes, job)
+		except (pickle.PicklingError, TypeError):
+			job.write(self.figure_axes)
+			return None
 
 	def destroy(self):
+		self.set_live_refresh(None)
+		self.cancel_replay()
+		self.figure_axes.remove_invalidation_hook(self.figure_axes_changed)
+		if self.view_group is not None:
+			self.view_group.remove(self)
 		self.panel.destroy()
@@ -23,10 +23,19 @@
 # Developed since: Aug 2008
 # File version: 0.3.1b
 
+import os
+import sys
+import time
+import threading
 import Tkinter
+import tkMessageBox
+import Image
 import ImageTk
 import tkFileDialog
 import matplotlib_backend_fr
+import matplotlib_backend_fr.frame_stats
+import matplotlib_backend_fr.interaction
+import matplotlib_backend_fr.interaction_trace
 
 # Allow updates for external ventry module ...
 
@@ -37,27 +46,65 @@ except:
 	import matplotlib_backend_fr.ventry as ventry
 
 
-class PanelFigureAxes:
+class PanelFigureAxes(matplotlib_backend_fr.interaction.Interaction):
 	def __init__(self, master,
 			event_handler_start_zoom, event_handler_zoom,
 			event_handler_start_pan, event_handler_pan,
 			event_handler_doubleclick_left,
 			event_handler_doubleclick_right,
 			image_generator,
-			shape = None):
+			shape = None,
+			frame_rate = None,
+			preview = None,
+			threaded = None,
+			progressive = None,
+			timing_source = None,
+			image_release = None,
+			event_handler_hover = None):
+		"""SHAPE is the initial size of the canvas in pixels.  Renders
+		triggered by mouse motion are coalesced and issued at most
+		FRAME_RATE times per second (default 25).  If PREVIEW is True,
+		dragging only moves or scales the last rendered frame, and the
+		figure is rendered once when the button is released.  If THREADED
+		is True, IMAGE_GENERATOR is called in a worker thread and must
+		return an image not shared with later calls.  If PROGRESSIVE is
+		True, frames while dragging are rendered at a reduced resolution
+		adapted to FRAME_RATE, by calling IMAGE_GENERATOR(SHAPE, SCALE =
+		SCALE), and a full resolution frame follows when the pointer
+		rests or the button is released.  TIMING_SOURCE, if given, is
+		called right after IMAGE_GENERATOR, in the same thread, and
+		returns a dictionary of further stage timings of that call.
+		IMAGE_RELEASE, if given, is called with each image from
+		IMAGE_GENERATOR once the panel no longer needs it.
+		EVENT_HANDLER_HOVER, if given, is called with the display
+		coordinates of the pointer and the size of the panel while no
+		button is held, at most once per idle period, and returns None or
+		(text, disp_coords) of a readout to show."""
 
 		if shape is None:
 			shape = (200,200)
-
-		self.event_handler_start_zoom = event_handler_start_zoom
-		self.event_handler_zoom = event_handler_zoom
-		self.event_handler_start_pan = event_handler_start_pan
-		self.event_handler_pan = event_handler_pan
+		if preview is None:
+			preview = False
+		if threaded is None:
+			threaded = False
+		if progressive is None:
+			progressive = False
+
+		# Mapping of the events to the handlers, and the rules when to
+		# render.
+		matplotlib_backend_fr.interaction.Interaction.__init__(self,
+				event_handler_start_zoom, event_handler_zoom,
+				event_handler_start_pan, event_handler_pan,
+				frame_rate = frame_rate)
 		self.event_handler_doubleclick_left = event_handler_doubleclick_left
 		self.event_handler_doubleclick_right = event_handler_doubleclick_right
 		self.image_generator = image_generator
+		self.timing_source = timing_source
+		self.image_release = image_release
+		self.event_handler_hover = event_handler_hover
 
 		self.viewport,self.viewport_tag = None,None
+		self.viewport_size = None
 
 		self.canvas = Tkinter.Canvas(master,
 				highlightthickness = 0,
@@ -74,78 +121,521 @@ class PanelFigureAxes:
 		self.canvas.bind('<Motion>', self.tk_motion)
 		self.canvas.bind('<Double-Button-1>', self.tk_double_left_button)
 		self.canvas.bind('<Double-Button-3>', self.tk_double_right_button)
-		self.pixelsize = None
+		self.canvas.bind('<Leave>', self.tk_leave)
 
-		self.motion_origin = None
-		self.zooming_origin = None
 		self.zooming_initial_distances = None
 		self.pan_cursor = None
-		self.motion_mode = 'none'
 
-	def map_to_display(self, (scrx, scry)):
-		return (float(scrx) / self.pixelsize[0],
-				1 - float(scry) / self.pixelsize[1])
+		# Frame scheduling ...
+
+		self.frame_after_id = None
+		self.dirty = False
+
+		# Drag preview ...
+
+		self.preview = preview
+		self.previewing = False
+		self.frame_image = None
+		self.preview_viewport = None
+
+		# Resizing ...
+
+		self.resize_preview = 'stretch'
+		self.resize_after_id = None
+		self.resize_viewport = None
+
+		# Seconds spent in the stages of the last frame (see
+		# matplotlib_backend_fr.frame_stats), and their rolling record.
+		self.frame_timing = {}
+		self.stats = matplotlib_backend_fr.frame_stats.FrameStats()
+		self.event_seconds = 0.0
+		self.overlay_tag = None
+
+		# Event recording, see matplotlib_backend_fr.interaction_trace.
+		self.recorder = None
+
+		# Hover readout ...
+
+		self.pending_hover = None
+		self.hover_after_id = None
+
+		# Progressive rendering ...
+
+		self.progressive = progressive
+		self.interaction_scale = 1.0
+		self.minimum_scale = 0.25
+		self.frame_scale = 1.0
+		self.refine_delay = 0.2
+		self.refine_after_id = None
+
+		# Background rendering ...
+
+		self.threaded = threaded
+		self.generation = 0
+		# The generation of the frame on screen; a frame newer than it is
+		# shown even if the view has moved on since it was requested.
+		self.shown_generation = 0
+		if self.threaded:
+			self.render_condition = threading.Condition()
+			self.render_request = None
+			self.render_result = None
+			self.render_stopped = False
+			self.poll_after_id = None
+			self.render_thread = threading.Thread(target = self.render_loop)
+			self.render_thread.setDaemon(True)
+			self.render_thread.start()
+
+	def start_recording(self, filename):
+		"""Record the mouse and resize events to the trace file FILENAME
+		until stop_recording()."""
+
+		self.stop_recording()
+		self.recorder = matplotlib_backend_fr.interaction_trace.\
+				TraceRecorder(filename)
+		if self.pixelsize is not None:
+			# The replay starts from the current size.
+			self.recorder.record('configure',
+					self.pixelsize[0], self.pixelsize[1])
+
+	def stop_recording(self):
+		if self.recorder is not None:
+			self.recorder.close()
+			self.recorder = None
+
+	def record(self, name, x, y):
+		if self.recorder is not None:
+			self.recorder.record(name, x, y)
 
 	def tk_configure(self, event):
-		self.pixelsize = (event.width, event.height)
+		"""Resizes come in storms while a window edge is dragged.  Until
+		the size has been stable for SELF.RESIZE_DELAY seconds, the last
+		frame is shown stretched to the new size (or, if
+		SELF.RESIZE_PREVIEW is 'crop', as it is), and only then a frame
+		is rendered."""
+
+		self.record('configure', event.width, event.height)
+		action = self.resize((event.width, event.height),
+				self.frame_image is not None)
+		if action is None:
+			return
+		if action == 'render':
+			self.update()
+			return
+
+		self.show_resize_preview()
+		self.cancel_resize()
+		self.resize_after_id = self.canvas.after(
+				int(self.resize_delay * 1000), self.tk_resized)
+
+	def show_resize_preview(self):
+		if self.resize_preview != 'stretch' or self.viewport_tag is None:
+			return
+		image = self.frame_image.resize(self.pixelsize, Image.NEAREST)
+		self.resize_viewport = ImageTk.PhotoImage(image)
+		self.canvas.coords(self.viewport_tag, 0, 0)
+		self.canvas.itemconfigure(self.viewport_tag,
+				image = self.resize_viewport)
+		self.previewing = True
+
+	def cancel_resize(self):
+		if self.resize_after_id is not None:
+			self.canvas.after_cancel(self.resize_after_id)
+			self.resize_after_id = None
+
+	def tk_resized(self):
+		self.resize_after_id = None
 		self.update()
 
 	def tk_press_left_button(self, event):
-		disp_coords = self.map_to_display((event.x, event.y))
-		self.motion_origin = (event.x, event.y)
-		self.motion_mode = 'zoom'
-		self.zooming_origin = disp_coords
-		self.event_handler_start_zoom(disp_coords)
+		self.record('press_left_button', event.x, event.y)
+		self.hide_readout()
+		self.start_drag('zoom', (event.x, event.y))
 
 	def tk_press_right_button(self, event):
-		disp_coords = self.map_to_display((event.x, event.y))
-		self.pan_origin = disp_coords
-		self.motion_mode = 'pan'
-		self.event_handler_start_pan()
+		self.record('press_right_button', event.x, event.y)
+		self.hide_readout()
+		self.start_drag('pan', (event.x, event.y))
 
 	def tk_release_left_button(self, event):
-		self.motion_mode = 'none'
+		self.record('release_left_button', event.x, event.y)
+		self.end_drag()
+		self.flush_motion()
 
 	def tk_release_right_button(self, event):
-		self.motion_mode = 'none'
+		self.record('release_right_button', event.x, event.y)
+		self.end_drag()
+		self.flush_motion()
 
 	def tk_double_left_button(self, event):
+		self.record('double_left_button', event.x, event.y)
 		self.event_handler_doubleclick_left()
 		self.update()
 
 	def tk_double_right_button(self, event):
+		self.record('double_right_button', event.x, event.y)
 		self.event_handler_doubleclick_right()
 
 	def tk_motion(self, event):
-		if self.motion_mode == 'zoom':
-			pixel_distances = (self.motion_origin[0] - event.x,
-					event.y - self.motion_origin[1])
-			factors=[(2.0 ** (pixel_distances[i] * 0.02)) for i in (0,1)]
-			self.event_handler_zoom(factors)
-			self.update()
-		elif self.motion_mode == 'pan':
-			disp_coords = self.map_to_display((event.x, event.y))
-			compensate = [disp_coords[i] - self.pan_origin[i] for i in (0,1)]
-			self.event_handler_pan(compensate)
+		self.record('motion', event.x, event.y)
+		if self.drag((event.x, event.y)):
+			self.cancel_refine()
+			self.schedule_update()
+		elif self.event_handler_hover is not None and \
+				self.pixelsize is not None:
+			# Look up the most recent position only, once the queued
+			# events are handled.
+			self.pending_hover = (event.x, event.y)
+			if self.hover_after_id is None:
+				self.hover_after_id = self.canvas.after_idle(self.tk_hover)
+
+	def tk_hover(self):
+		self.hover_after_id = None
+		if self.pending_hover is None or self.motion_mode != 'none':
+			return
+		disp_coords = self.map_to_display(self.pending_hover)
+		self.pending_hover = None
+		readout = self.event_handler_hover(disp_coords, self.pixelsize)
+		if readout is None:
+			self.hide_readout()
+		else:
+			(text, point) = readout
+			self.show_readout(text, self.map_from_display(point))
+
+	def tk_leave(self, event):
+		self.cancel_hover()
+		self.hide_readout()
+
+	def cancel_hover(self):
+		self.pending_hover = None
+		if self.hover_after_id is not None:
+			self.canvas.after_cancel(self.hover_after_id)
+			self.hover_after_id = None
+
+	def show_readout(self, text, (scrx, scry)):
+		"""Mark the screen position (SCRX, SCRY) and label it with TEXT."""
+
+		self.hide_readout()
+		self.canvas.create_oval(scrx - 3, scry - 3, scrx + 3, scry + 3,
+				outline = 'red', tags = 'readout')
+		# Keep the label inside the canvas.
+		if scrx > self.pixelsize[0] / 2:
+			(anchor, offset) = ('e', -6)
+		else:
+			(anchor, offset) = ('w', 6)
+		self.canvas.create_text((scrx + offset, scry), text = text,
+				anchor = anchor, fill = 'red', font = ('Courier', 9),
+				tags = 'readout')
+
+	def hide_readout(self):
+		self.canvas.delete('readout')
+
+	def apply_motion(self, motion):
+		start = time.time()
+		matplotlib_backend_fr.interaction.Interaction.apply_motion(self,
+				motion)
+		self.event_seconds += time.time() - start
+
+	def flush_motion(self):
+		"""Render the pending motion, if any, without waiting for the next
+		frame."""
+
+		if self.pending_motion is not None or self.previewing or \
+				self.frame_scale != 1:
+			self.cancel_frame()
+			self.dirty = True
+			self.tk_frame()
+
+	def schedule_update(self):
+		"""Mark the panel dirty and render at the next frame slot.  Calls
+		arriving before that slot are merged into one render."""
+
+		self.dirty = True
+		if self.frame_after_id is not None:
+			return
+		delay = self.get_frame_delay(time.time())
+		if delay <= 0:
+			self.frame_after_id = self.canvas.after_idle(self.tk_frame)
+		else:
+			self.frame_after_id = self.canvas.after(
+					int(delay * 1000), self.tk_frame)
+
+	def cancel_frame(self):
+		if self.frame_after_id is not None:
+			self.canvas.after_cancel(self.frame_after_id)
+			self.frame_after_id = None
+
+	def tk_frame(self):
+		self.frame_after_id = None
+		motion = self.take_motion()
+		if motion is not None:
+			if self.preview and self.motion_mode != 'none':
+				self.show_preview(motion)
+				return
+			self.dirty = True
+		if self.dirty:
 			self.update()
 
-	def update(self):
+	def show_preview(self, (mode, x, y)):
+		"""Show the last frame moved or scaled according to the drag to
+		(X, Y), without rendering the figure."""
+
+		if self.viewport_tag is None or self.frame_image is None:
+			return
+		self.previewing = True
+		(originx, originy) = self.motion_origin
+		if mode == 'pan':
+			self.canvas.coords(self.viewport_tag, x - originx, y - originy)
+		elif mode == 'zoom':
+			# Data limits scale by FACTORS around the origin, so the
+			# output pixel P shows the frame pixel ORIGIN + (P - ORIGIN) *
+			# FACTORS.
+			(factorx, factory) = self.zoom_factors((x, y))
+			image = self.frame_image.transform(self.frame_image.size,
+					Image.AFFINE,
+					(factorx, 0, originx * (1 - factorx),
+					 0, factory, originy * (1 - factory)),
+					Image.BILINEAR)
+			if self.preview_viewport is None:
+				self.preview_viewport = ImageTk.PhotoImage(image)
+			else:
+				self.preview_viewport.paste(image)
+			self.canvas.itemconfigure(self.viewport_tag,
+					image = self.preview_viewport)
+		if not matplotlib_backend_fr.has_mainloop:
+			self.canvas.update()
+
+	def update(self, scale = None):
+		"""Render a frame.  SCALE defaults to the reduced resolution while
+		dragging in progressive mode, and to 1 otherwise."""
+
+		self.dirty = False
+		self.previewing = False
+		self.cancel_refine()
+		self.cancel_resize()
+		self.last_frame_time = time.time()
 		if self.pixelsize is None: 
 			return
-		image = self.image_generator(self.pixelsize)
-		(old_viewport, old_viewport_tag) = (self.viewport, self.viewport_tag)
-		self.viewport = ImageTk.PhotoImage(image)
-		self.viewport_tag = self.canvas.create_image((0,0), 
-				image = self.viewport, anchor='nw')
-		if old_viewport is not None and old_viewport_tag is not None:
-			self.canvas.delete(old_viewport_tag)
+		if scale is None:
+			if self.progressive and self.motion_mode != 'none':
+				scale = self.interaction_scale
+			else:
+				scale = 1
+		self.generation += 1
+		if self.threaded:
+			self.post_render(self.generation, self.pixelsize, scale)
+			return
+		self.show_image(*self.generate(self.pixelsize, scale))
+
+	def generate(self, shape, scale):
+		"""Call the image generator.  Returns (IMAGE, SCALE, SECONDS,
+		TIMING) with TIMING from the timing source."""
+
+		start = time.time()
+		if scale == 1:
+			image = self.image_generator(shape)
+		else:
+			image = self.image_generator(shape, scale = scale)
+		seconds = time.time() - start
+		if self.timing_source is not None:
+			timing = dict(self.timing_source())
+		else:
+			timing = {}
+		return (image, scale, seconds, timing)
+
+	def adapt_scale(self, seconds):
+		"""Adapt the resolution of interactive frames to the time SECONDS
+		the last one took.  Halving the scale quarters the pixels."""
+
+		if seconds > self.frame_interval:
+			self.interaction_scale = max(self.interaction_scale / 2,
+					self.minimum_scale)
+		elif seconds < self.frame_interval / 4:
+			self.interaction_scale = min(self.interaction_scale * 2, 1.0)
+
+	def cancel_refine(self):
+		if self.refine_after_id is not None:
+			self.canvas.after_cancel(self.refine_after_id)
+			self.refine_after_id = None
+
+	def tk_refine(self):
+		"""The pointer rested, replace the reduced frame."""
+
+		self.refine_after_id = None
+		self.update(scale = 1)
+
+	def post_render(self, generation, shape, scale):
+		"""Hand a render request to the worker.  A request not yet started
+		is replaced, since only the newest frame will be shown."""
+
+		self.render_condition.acquire()
+		try:
+			self.render_request = (generation, shape, scale)
+			self.render_condition.notify()
+		finally:
+			self.render_condition.release()
+		if self.poll_after_id is None:
+			self.poll_after_id = self.canvas.after(5, self.tk_poll_render)
+
+	def render_loop(self):
+		"""Body of the worker thread."""
+
+		while True:
+			self.render_condition.acquire()
+			try:
+				while self.render_request is None and \
+						not self.render_stopped:
+					self.render_condition.wait()
+				if self.render_stopped:
+					return
+				((generation, shape, scale), self.render_request) = \
+						(self.render_request, None)
+			finally:
+				self.render_condition.release()
+
+			try:
+				result = (generation, self.generate(shape, scale), None)
+			except:
+				result = (generation, None, sys.exc_info())
+
+			self.render_condition.acquire()
+			try:
+				(older, self.render_result) = (self.render_result, result)
+			finally:
+				self.render_condition.release()
+			if older is not None and older[1] is not None:
+				# Not polled in time, and superseded.
+				self.release_image(older[1][0])
+
+	def tk_poll_render(self):
+		"""Swap in the result of the worker if it is newer than the frame
+		on screen.  While dragging, the view moves on faster than heavy
+		figures render, so frames requested before the newest one are
+		shown as well, rather than none until the pointer rests.  Polls
+		until the newest frame arrived."""
+
+		self.poll_after_id = None
+		self.render_condition.acquire()
+		try:
+			(result, self.render_result) = (self.render_result, None)
+		finally:
+			self.render_condition.release()
+
+		if result is not None:
+			(generation, frame, exc_info) = result
+			if exc_info is not None:
+				raise exc_info[0], exc_info[1], exc_info[2]
+			if generation > self.shown_generation:
+				self.shown_generation = generation
+				self.show_image(*frame)
+			elif frame is not None:
+				# Older than the frame on screen.
+				self.release_image(frame[0])
+			if self.shown_generation == self.generation:
+				return
+
+		self.poll_after_id = self.canvas.after(5, self.tk_poll_render)
+
+	def release_image(self, image):
+		if self.image_release is not None and image is not None:
+			self.image_release(image)
+
+	def show_image(self, image, scale = 1, seconds = None, timing = None):
+		if self.progressive and seconds is not None and \
+				self.motion_mode != 'none':
+			self.adapt_scale(seconds)
+		if image.size != tuple(self.pixelsize):
+			resized = image.resize(self.pixelsize, Image.BILINEAR)
+			self.release_image(image)
+			image = resized
+		self.frame_scale = scale
+		if scale != 1:
+			self.refine_after_id = self.canvas.after(
+					int(self.refine_delay * 1000), self.tk_refine)
+
+		if self.frame_image is not image:
+			self.release_image(self.frame_image)
+		self.frame_image = image
+		self.resize_viewport = None
+		start = time.time()
+		if self.viewport is not None and self.viewport_size == image.size:
+			# Update the pixels in place, and undo a preview.
+			self.viewport.paste(image)
+			self.canvas.coords(self.viewport_tag, 0, 0)
+			self.canvas.itemconfigure(self.viewport_tag,
+					image = self.viewport)
+		else:
+			# First frame or resized, the only case which creates a new
+			# PhotoImage and canvas item.
+			(old_viewport, old_viewport_tag) = \
+					(self.viewport, self.viewport_tag)
+			self.viewport = ImageTk.PhotoImage(image)
+			self.viewport_size = image.size
+			self.viewport_tag = self.canvas.create_image((0,0), 
+					image = self.viewport, anchor='nw')
+			self.preview_viewport = None
+			if old_viewport is not None and old_viewport_tag is not None:
+				self.canvas.delete(old_viewport_tag)
+			self.canvas.tag_raise('readout')
+		converted = time.time()
 		if not matplotlib_backend_fr.has_mainloop:
 			self.canvas.update()
+		else:
+			self.canvas.update_idletasks()
+		if timing is None:
+			timing = {}
+		timing.update(event = self.event_seconds, render = seconds,
+				convert = converted - start, blit = time.time() - converted)
+		self.event_seconds = 0.0
+		self.frame_timing = timing
+		self.stats.record(timing)
+		if self.overlay_tag is not None:
+			self.update_overlay()
+
+	def set_overlay(self, overlay):
+		"""Show or hide a readout of frame rate and latency."""
+
+		if overlay and self.overlay_tag is None:
+			self.overlay_tag = self.canvas.create_text((4, 4),
+					anchor = 'nw', fill = 'red', font = ('Courier', 9))
+			self.update_overlay()
+		elif not overlay and self.overlay_tag is not None:
+			self.canvas.delete(self.overlay_tag)
+			self.overlay_tag = None
+
+	def update_overlay(self):
+		fps = self.stats.get_fps()
+		lines = []
+		if fps is not None:
+			lines.append('%5.1f fps' % fps)
+		for stage in matplotlib_backend_fr.frame_stats.STAGES:
+			median = self.stats.get_percentile(stage, 50)
+			if median is not None:
+				lines.append('%-7s %6.1f ms  p90 %6.1f ms' % (stage,
+						median * 1000,
+						self.stats.get_percentile(stage, 90) * 1000))
+		self.canvas.itemconfigure(self.overlay_tag, text = '\n'.join(lines))
+		self.canvas.tag_raise(self.overlay_tag)
 	
 	def destroy(self):
+		self.stop_recording()
+		self.cancel_frame()
+		self.cancel_refine()
+		self.cancel_resize()
+		self.cancel_hover()
+		if self.threaded:
+			if self.poll_after_id is not None:
+				self.canvas.after_cancel(self.poll_after_id)
+			self.render_condition.acquire()
+			try:
+				self.render_stopped = True
+				self.render_condition.notify()
+			finally:
+				self.render_condition.release()
 		if self.viewport is not None and self.viewport_tag is not None:
 			self.canvas.delete(self.viewport_tag)
 		del self.viewport, self.viewport_tag
+		self.release_image(self.frame_image)
+		self.frame_image = None
 		self.canvas.destroy()
 		del self.canvas
 
@@ -219,6 +709,19 @@ class SettingsDialog(Tkinter.Toplevel):
 				command = self.tk_save_img)
 		self.button_img.pack(side = Tkinter.TOP, fill = Tkinter.X)
 
+		# Create export progress widgets.
+		self.export_task = None
+		self.export_after_id = None
+		self.label_export = Tkinter.Label(self.lframe_save, text = '',
+				width = 24, anchor = Tkinter.W)
+		self.label_export.pack(side = Tkinter.TOP, fill = Tkinter.X)
+		self.label_export.bind('<Destroy>', self.tk_destroy_export)
+		self.button_cancel_export = Tkinter.Button(self.lframe_save,
+				text = 'Cancel Export',
+				command = self.tk_cancel_export,
+				state = Tkinter.DISABLED)
+		self.button_cancel_export.pack(side = Tkinter.TOP, fill = Tkinter.X)
+
 		# Create Settings widgets ...
 
 		self.lframe_settings = Tkinter.LabelFrame(self, text = 'Settings')
@@ -334,8 +837,8 @@ class SettingsDialog(Tkinter.Toplevel):
 				parent = self,
 				title = 'Save Diagram as Encapsulated PostScript')
 		if filename != '':
-			self.hook_save_eps(filename,
-					shape = (self.eps_xdim.get(), self.eps_ydim.get()))
+			self.watch_export(self.hook_save_eps(filename,
+					shape = (self.eps_xdim.get(), self.eps_ydim.get())))
 
 	def tk_save_img(self):
 		filename = tkFileDialog.asksaveasfilename(
@@ -346,13 +849,66 @@ class SettingsDialog(Tkinter.Toplevel):
 				parent = self,
 				title = 'Save Diagram as Image')
 		if filename != '':
-			self.hook_save_img(filename,
-					shape = (self.img_xdim.get(), self.img_ydim.get()))
+			self.watch_export(self.hook_save_img(filename,
+					shape = (self.img_xdim.get(), self.img_ydim.get())))
+
+	def watch_export(self, task):
+		"""Show the progress of TASK, a
+		matplotlib_backend_fr.export.BackgroundExport returned by the save
+		hooks, or None if the hook exported right away.  Only one export
+		runs at a time."""
+
+		if task is None:
+			return
+		self.export_task = task
+		self.button_eps.config(state = Tkinter.DISABLED)
+		self.button_img.config(state = Tkinter.DISABLED)
+		self.button_cancel_export.config(state = Tkinter.NORMAL)
+		self.tk_poll_export()
+
+	def tk_poll_export(self):
+		self.export_after_id = None
+		task = self.export_task
+		state = task.poll()
+		name = os.path.basename(task.job.filename)
+		if not task.is_finished():
+			self.label_export.config(text = '%s %s ... %.0f s' % (
+					state.capitalize(), name, task.get_elapsed()))
+			self.export_after_id = self.after(200, self.tk_poll_export)
+			return
+
+		if state == 'error':
+			self.label_export.config(text = 'Failed: %s' % name)
+			tkMessageBox.showerror('Export failed', task.error,
+					parent = self)
+		elif state == 'done':
+			self.label_export.config(text = 'Saved %s (%.1f s)' % (
+					name, task.get_elapsed()))
+		else:
+			self.label_export.config(text = 'Cancelled %s' % name)
+		self.export_task = None
+		self.button_eps.config(state = Tkinter.NORMAL)
+		self.button_img.config(state = Tkinter.NORMAL)
+		self.button_cancel_export.config(state = Tkinter.DISABLED)
+
+	def tk_cancel_export(self):
+		if self.export_task is not None:
+			self.export_task.cancel()
+			if self.export_after_id is not None:
+				self.after_cancel(self.export_after_id)
+			self.tk_poll_export()
+
+	def tk_destroy_export(self, event):
+		# The export itself goes on when the dialog is closed.
+		if self.export_after_id is not None:
+			self.after_cancel(self.export_after_id)
+			self.export_after_id = None
 
 	def tk_update_labeling(self):
-		self.figure_axes.set_title(self.title.get())
-		self.figure_axes.set_xlabel(self.xlabel.get())
-		self.figure_axes.set_ylabel(self.ylabel.get())
+		with self.figure_axes.batch():
+			self.figure_axes.set_title(self.title.get())
+			self.figure_axes.set_xlabel(self.xlabel.get())
+			self.figure_axes.set_ylabel(self.ylabel.get())
 
 		self.hook_update_figure_axes()
 		self.update_title()
@@ -375,10 +931,11 @@ class SettingsDialog(Tkinter.Toplevel):
 			# We are in explicit mode, thus write the values typed in to
 			# the figure_axes ...
 
-			self.figure_axes.set_xlim(
-					(self.xlim_left.get(), self.xlim_right.get()))
-			self.figure_axes.set_ylim(
-					(self.ylim_bottom.get(), self.ylim_top.get()))
+			with self.figure_axes.batch():
+				self.figure_axes.set_xlim(
+						(self.xlim_left.get(), self.xlim_right.get()))
+				self.figure_axes.set_ylim(
+						(self.ylim_bottom.get(), self.ylim_top.get()))
 
 			# Only in this branch update the figure_axes.
 			self.hook_update_figure_axes()
@@ -0,0 +1,111 @@
+# Copyright (c) 2008, 2009, 2010 Friedrich Romstedt
+# <www.friedrichromstedt.org>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import matplotlib_backend_fr.cache
+
+
+class ViewGroup:
+	"""KernelFigureAxes instances whose x limits (if X, default True) and
+	y limits (if Y, default False) follow each other.  When one of them is
+	zoomed or panned, the others are updated together in one pass from the
+	Tk main loop, rendering only the panels whose limits changed.  With
+	FRAME_CACHE_BYTES, the frames of all members are kept in one shared
+	matplotlib_backend_fr.cache.LRUCache of that size."""
+
+	def __init__(self, x = None, y = None, frame_cache_bytes = None):
+		if x is None:
+			x = True
+		if y is None:
+			y = False
+
+		self.x = x
+		self.y = y
+		self.kernels = []
+		if frame_cache_bytes is None:
+			self.frame_cache = None
+		else:
+			self.frame_cache = matplotlib_backend_fr.cache.\
+					LRUCache(frame_cache_bytes)
+
+		# Kernels to be rendered in the next pass, at SCALE.
+		self.pending = []
+		self.scale = None
+		self.after_id = None
+		self.after_widget = None
+
+	def add(self, kernel):
+		"""Link KERNEL, taking over the limits of the group."""
+
+		if kernel.view_group is not None:
+			kernel.view_group.remove(kernel)
+		self.kernels.append(kernel)
+		kernel.view_group = self
+		if self.frame_cache is not None:
+			kernel.figure_axes.set_frame_cache(None, cache = self.frame_cache)
+		if len(self.kernels) > 1:
+			self.propagate(self.kernels[0])
+
+	def remove(self, kernel):
+		if self.after_id is not None:
+			# Finish the pass now, its widget may be about to go.
+			self.after_widget.after_cancel(self.after_id)
+			self.tk_render()
+		self.kernels.remove(kernel)
+		kernel.view_group = None
+
+	def propagate(self, source):
+		"""Copy the linked limits of SOURCE to the other kernels, and
+		schedule the pass rendering those which changed."""
+
+		xlim = tuple(source.figure_axes.get_xlim())
+		ylim = tuple(source.figure_axes.get_ylim())
+		for kernel in self.kernels:
+			if kernel is source:
+				continue
+			figure_axes = kernel.figure_axes
+			changed = False
+			with figure_axes.batch():
+				if self.x and tuple(figure_axes.get_xlim()) != xlim:
+					figure_axes.set_xlim(xlim)
+					changed = True
+				if self.y and tuple(figure_axes.get_ylim()) != ylim:
+					figure_axes.set_ylim(ylim)
+					changed = True
+			if changed and kernel not in self.pending:
+				self.pending.append(kernel)
+
+		# Follow the resolution of a progressive drag; the panels refine
+		# by themselves when it rests.
+		panel = source.panel
+		if panel.progressive and panel.motion_mode != 'none':
+			self.scale = panel.interaction_scale
+		else:
+			self.scale = None
+
+		if self.pending and self.after_id is None:
+			self.after_widget = panel.canvas
+			self.after_id = self.after_widget.after_idle(self.tk_render)
+
+	def tk_render(self):
+		self.after_id = None
+		(pending, self.pending) = (self.pending, [])
+		for kernel in pending:
+			kernel.panel.update(scale = self.scale)
@@ -22,7 +22,8 @@
 # Developed since: Apr 2009
 # File version: 0.1.11b
 
-import types
+import re
+import __builtin__
 import Tkinter
 
 class Validity:
@@ -30,46 +31,92 @@ class Validity:
 		self.valid=valid
 		self.value=value
 
-def number(str):
-	try:
-		value=eval(str)
-		vtype=type(value)
-		if vtype==types.IntType or vtype==types.FloatType or \
-				vtype==types.LongType:
-			return Validity(True,value)
-		else:
-			return Validity(False)
-	except:
-		return Validity(False)
-
-def int(str):
-	try:
-		value=eval(str)
-		vtype=type(value)
-		if vtype==types.IntType or vtype==types.LongType:
-			return Validity(True,value)
-		else:
-			return Validity(False)
-	except:
-		return Validity(False)
+# Python literals, with optional blanks around and after the sign.
+INT_PATTERN=re.compile(
+		r'^\s*([-+]?)\s*(0[xX][0-9a-fA-F]+|0[oO][0-7]+|0[0-7]*|[1-9][0-9]*)'
+		r'([lL]?)\s*$')
+FLOAT_PATTERN=re.compile(
+		r'^\s*([-+]?)\s*((?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?'
+		r'|[0-9]+[eE][-+]?[0-9]+)\s*$')
+NONE_PATTERN=re.compile(r'^\s*None\s*$')
+
+def parse_int(str):
+	"""Return the value of the int or long literal STR, or None."""
+
+	match=INT_PATTERN.match(str)
+	if match is None:
+		return None
+	(sign,digits,suffix)=match.groups()
+	value=__builtin__.int(sign+digits,0)
+	if suffix:
+		value=long(value)
+	return value
+
+def parse_float(str):
+	match=FLOAT_PATTERN.match(str)
+	if match is None:
+		return None
+	return float(match.group(1)+match.group(2))
+
+class Parser:
+	"""Validator from the parse functions PARSES, the first one not
+	returning None giving the value.  Parses no expressions, only
+	literals.  The result for the last input is remembered, since the
+	text is validated again on every key, also when it did not change."""
+
+	def __init__(self,*parses):
+		self.parses=parses
+		self.last=None
+
+	def __call__(self,str):
+		if self.last is not None and self.last[0]==str:
+			return self.last[1]
+		validity=Validity(False)
+		for parse in self.parses:
+			value=parse(str)
+			if value is not None:
+				validity=Validity(True,value)
+				break
+		self.last=(str,validity)
+		return validity
+
+class NoneParser(Parser):
+	"""Like Parser, but also accepting 'None'."""
+
+	def __call__(self,str):
+		if NONE_PATTERN.match(str):
+			return Validity(True,None)
+		return Parser.__call__(self,str)
+
+number=Parser(parse_int,parse_float)
+int=Parser(parse_int)
+number_none=NoneParser(parse_int,parse_float)
 
 def string(str):
 	return Validity(True,str)
 
-def number_none(str):
-	try:
-		value=eval(str)
-		if number(str).valid or value is None:
-			return Validity(True,value)
-		else:
-			return Validity(False)
-	except:
-		return Validity(False)
-
 
 class VEntry:
 	def __init__(self,master,validate=None,initial='',formatter=None,
-			hook_update=None,**entry_kwargs):
+			hook_update=None,update_mode=None,update_delay=None,
+			**entry_kwargs):
+		"""HOOK_UPDATE is called with valid input, depending on UPDATE_MODE:
+		'key' (the default) on every key, 'debounce' when no key has been
+		typed for UPDATE_DELAY seconds (default 0.4), or on Enter or when
+		leaving the entry, and 'enter' only on Enter or when leaving the
+		entry."""
+
+		if update_mode is None:
+			update_mode='key'
+		if update_delay is None:
+			update_delay=0.4
+		if update_mode not in ('key','debounce','enter'):
+			raise ValueError('update_mode must be "key", "debounce" or "enter"')
+		self.update_mode=update_mode
+		self.update_delay=update_delay
+		self.update_after_id=None
+		self.committed=None
+
 		self.var=Tkinter.StringVar(master)
 		self.entry=Tkinter.Entry(master,textvariable=self.var,
 				**entry_kwargs)
@@ -86,12 +133,49 @@ class VEntry:
 
 	def initialise(self, callback = True):
 		self.entry.bind('<KeyRelease>', self.tk_key_release)
+		if self.update_mode!='key':
+			self.entry.bind('<Return>', self.tk_commit)
+			self.entry.bind('<KP_Enter>', self.tk_commit)
+			self.entry.bind('<FocusOut>', self.tk_focus_out)
 		self.var.set(self.formatter(self.initial))
+		self.committed=self.var.get()
 		if not self.validate(callback = callback):
 			raise ValueError('error in initialisation: initial value not valid')
 
 	def tk_key_release(self, event):
+		if self.update_mode=='key':
+			self.validate()
+			return
+		if event.keysym in ('Return','KP_Enter'):
+			# Committed on the key press already.
+			return
+		self.validate(callback=False)
+		if self.update_mode=='debounce':
+			self.cancel_update()
+			self.update_after_id=self.entry.after(
+					__builtin__.int(self.update_delay*1000),
+					self.tk_settled)
+
+	def tk_settled(self):
+		self.update_after_id=None
+		if self.var.get()!=self.committed:
+			self.tk_commit()
+
+	def tk_focus_out(self, event):
+		# Tabbing through the entries changes nothing.
+		self.cancel_update()
+		if self.var.get()!=self.committed:
+			self.tk_commit()
+
+	def tk_commit(self, event=None):
+		self.cancel_update()
+		self.committed=self.var.get()
 		self.validate()
+
+	def cancel_update(self):
+		if self.update_after_id is not None:
+			self.entry.after_cancel(self.update_after_id)
+			self.update_after_id=None
 	
 	def validate(self,callback=True):
 		validity=self.validate_fn(self.var.get())
@@ -105,7 +189,9 @@ class VEntry:
 		return validity.valid
 
 	def set(self,value,callback=True):
+		self.cancel_update()
 		self.var.set(self.formatter(value))
+		self.committed=self.var.get()
 		return self.validate(callback=callback)
 
 	def get(self):
@@ -130,6 +216,7 @@ class VEntry:
 		self.entry['state']='normal'
 
 	def destroy(self):
+		self.cancel_update()
 		self.entry.destroy()
 
 